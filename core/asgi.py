@@ -3,6 +3,11 @@ ASGI config for core project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Run it with an ASGI server so the async views (``/api/async/...``) do not block
+a worker thread while they wait on the database, e.g.:
+
+    gunicorn core.asgi:application -k uvicorn.workers.UvicornWorker -w 2
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
@@ -50,6 +50,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Disabled unless QUERY_TIMING is on (see below)
+    'store.middleware.QueryTimingMiddleware',
 ]
 
 ROOT_URLCONF = 'core.urls'
@@ -129,6 +131,13 @@ import dj_database_url
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
+# EXPORT JOBS: finished CSV reports written by `manage.py run_export_jobs`
+EXPORT_ROOT = os.environ.get('EXPORT_ROOT', os.path.join(BASE_DIR, 'exports'))
+
+# QUERY TIMING (opt-in): per-request SQL stats in a Server-Timing header + rotating log
+QUERY_TIMING = os.environ.get('QUERY_TIMING') == '1'
+QUERY_TIMING_LOG = os.environ.get('QUERY_TIMING_LOG', os.path.join(BASE_DIR, 'logs', 'query_timing.jsonl'))
+
 # DATABASE CONFIGURATION
 # If there is a DATABASE_URL env variable (on Render), use it.
 # Otherwise, use local SQLite (on your PC).
@@ -1,6 +1,19 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User, Product, Sale, Customer, Payout, ProductChangeRequest
+from django.db.models import Q
+from .models import User, Product, Sale, Customer, Payout, ProductChangeRequest, InvestorBalance, SalesDailyRollup, ExportJob, ProductForecast, RestockRecommendation
+from .search import filter_search
+
+class ReadOnlyAdminMixin:
+    """Tables derived from the ledger: browsable, but never added, edited or deleted by hand."""
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
 
 # 1. Custom User Admin
 @admin.register(User)
@@ -17,9 +30,17 @@ class CustomUserAdmin(UserAdmin):
 class ProductAdmin(admin.ModelAdmin):
     list_display = ('product_id', 'name', 'investor', 'quantity', 'buying_price', 'selling_price', 'stock_status')
     list_filter = ('investor', 'created_at')
-    search_fields = ('name', 'product_id', 'investor__username')
+    search_fields = ('name', 'product_id')
     readonly_fields = ('product_id', 'created_at')
 
+    def get_search_results(self, request, queryset, search_term):
+        # Trigram index for name / product_id instead of LIKE across every row, plus the owner
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        matches = filter_search(Product.objects.all(), 'P', term).values('pk')
+        return queryset.filter(Q(pk__in=matches) | Q(investor__username__icontains=term)), False
+
     # Custom column to show Low Stock warning
     def stock_status(self, obj):
         if obj.quantity <= obj.low_stock_threshold:
@@ -35,6 +56,17 @@ class SaleAdmin(admin.ModelAdmin):
     search_fields = ('transaction_id', 'product__name', 'customer__name', 'customer__mobile')
     date_hierarchy = 'date' # Adds a date drill-down bar at the top
 
+    def get_search_results(self, request, queryset, search_term):
+        # Receipt number, or products / customers found through the search index
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        products = filter_search(Product.objects.all(), 'P', term).values('pk')
+        customers = filter_search(Customer.objects.all(), 'C', term).values('pk')
+        return queryset.filter(
+            Q(transaction_id__iexact=term) | Q(product__in=products) | Q(customer__in=customers)
+        ), False
+
 # 4. Customer Admin
 @admin.register(Customer)
 class CustomerAdmin(admin.ModelAdmin):
@@ -42,6 +74,9 @@ class CustomerAdmin(admin.ModelAdmin):
     search_fields = ('name', 'mobile', 'email')
     ordering = ('-created_at',)
 
+    def get_search_results(self, request, queryset, search_term):
+        return filter_search(queryset, 'C', search_term), False
+
 # 5. Payout Admin
 @admin.register(Payout)
 class PayoutAdmin(admin.ModelAdmin):
@@ -54,4 +89,40 @@ class ChangeRequestAdmin(admin.ModelAdmin):
     list_display = ('request_type', 'requester', 'name', 'status', 'created_at')
     list_filter = ('status', 'request_type', 'requester')
     search_fields = ('name', 'requester__username')
-    readonly_fields = ('created_at',)
\ No newline at end of file
+    readonly_fields = ('created_at',)
+
+# 7. Investor Balance Admin (Read-only, maintained by the ledger)
+@admin.register(InvestorBalance)
+class InvestorBalanceAdmin(ReadOnlyAdminMixin, admin.ModelAdmin):
+    list_display = ('investor', 'earned', 'paid', 'due', 'updated_at')
+
+# 8. Daily Sales Rollup Admin (Read-only, maintained by the ledger)
+@admin.register(SalesDailyRollup)
+class SalesDailyRollupAdmin(ReadOnlyAdminMixin, admin.ModelAdmin):
+    list_display = ('day', 'product', 'investor', 'payment_method', 'sale_count', 'quantity', 'revenue')
+    list_filter = ('payment_method', 'investor')
+    date_hierarchy = 'day'
+
+# 9. Export Job Admin
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'requested_by', 'status', 'row_count', 'created_at', 'finished_at')
+    list_filter = ('status', 'kind')
+    readonly_fields = ('created_at', 'started_at', 'finished_at')
+
+# 10. Demand Forecast Admin (Read-only, replaced by refresh_forecasts)
+@admin.register(ProductForecast)
+class ProductForecastAdmin(ReadOnlyAdminMixin, admin.ModelAdmin):
+    list_display = ('product', 'daily_rate', 'trend', 'next_7_days', 'next_30_days', 'alpha', 'error', 'generated_at')
+    list_select_related = ('product',)
+    ordering = ('-next_7_days',)
+    search_fields = ('product__name', 'product__product_id')
+
+# 11. Restock Recommendation Admin (Read-only, upserted by refresh_restock)
+@admin.register(RestockRecommendation)
+class RestockRecommendationAdmin(ReadOnlyAdminMixin, admin.ModelAdmin):
+    list_display = ('product', 'status', 'stock', 'velocity', 'days_of_cover', 'reorder_point', 'reorder_qty', 'computed_at')
+    list_filter = ('status',)
+    list_select_related = ('product',)
+    ordering = ('days_of_cover',)
+    search_fields = ('product__name', 'product__product_id')
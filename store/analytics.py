@@ -1,27 +1,250 @@
-import pandas as pd
-from .models import Sale
+from decimal import Decimal
+from .models import Sale, User, Product, SalesDailyRollup, ProductForecast
+from .search import filter_search
+from .pagination import keyset_page
+from django.db.models import Q, F, Sum, Count, Max, Value, CharField, DecimalField
+from django.db.models.functions import Coalesce, Concat, Cast
+from django.core.cache import cache
 from django.utils import timezone
-from datetime import timedelta
+from datetime import datetime, time, timedelta
+
+# ==========================================
+# TOP PRODUCTS (cached per investor)
+# ==========================================
+TOP_PRODUCTS_DAYS = 30
+TOP_PRODUCTS_MAX = 10      # rows cached per investor, callers slice what they need
+TOP_PRODUCTS_TTL = 300     # seconds; also bounds staleness for workers that missed an invalidation
+
+def top_products_key(investor_id=None):
+    return f"store:top_products:{investor_id or 'all'}"
+
+def get_top_products(investor_id=None, limit=5):
+    """
+    Best sellers of the last TOP_PRODUCTS_DAYS days ranked by quantity, as
+    [{'product_id', 'name', 'quantity', 'revenue'}], for one investor (None = store-wide).
+    One grouped query on the daily rollup, cached until the next sale for that investor.
+    """
+    key = top_products_key(investor_id)
+    rows = cache.get(key)
+    if rows is None:
+        since = timezone.localdate() - timedelta(days=TOP_PRODUCTS_DAYS)
+        rollup = SalesDailyRollup.objects.filter(day__gte=since, product__isnull=False)
+        if investor_id:
+            rollup = rollup.filter(investor_id=investor_id)
+
+        ranked = rollup.values('product_id', 'product__name').annotate(
+            total_qty=Sum('quantity'), total_revenue=Sum('revenue')
+        ).order_by('-total_qty', '-total_revenue', 'product_id')[:TOP_PRODUCTS_MAX]
+
+        rows = [
+            {
+                'product_id': row['product_id'],
+                'name': row['product__name'],
+                'quantity': row['total_qty'],
+                'revenue': round(row['total_revenue'], 2),
+            }
+            for row in ranked
+        ]
+        cache.set(key, rows, TOP_PRODUCTS_TTL)
+    return rows[:limit]
+
+def invalidate_top_products(investor_ids):
+    """Drops the cached lists of these investors and the store-wide one."""
+    cache.delete_many([top_products_key(i) for i in investor_ids] + [top_products_key()])
+
+def get_demand_forecast(investor_id=None, limit=5):
+    """Products with the highest predicted demand for the next 7 days (read from ProductForecast)."""
+    forecasts = ProductForecast.objects.filter(next_7_days__gt=0).select_related('product')
+    if investor_id:
+        forecasts = forecasts.filter(product__investor_id=investor_id)
+    return list(forecasts.order_by('-next_7_days')[:limit])
 
 def get_predicted_top_product(investor_user):
-    # 1. Get sales data for this investor from the last 30 days
-    last_month = timezone.now() - timedelta(days=30)
-    sales = Sale.objects.filter(
-        product__investor=investor_user, 
-        date__gte=last_month
-    ).values('product__name', 'quantity', 'date')
-
-    if not sales:
-        return "Not enough data"
-
-    # 2. Convert to Pandas DataFrame
-    df = pd.DataFrame(list(sales))
-
-    # 3. Group by Product Name and Sum the Quantity
-    # This finds the most popular item based on recent history
-    top_products = df.groupby('product__name')['quantity'].sum().sort_values(ascending=False)
-
-    # 4. Return the name of the top product
-    if not top_products.empty:
-        return top_products.index[0] # Returns name of #1 product
-    return "Unknown"
\ No newline at end of file
+    top = get_demand_forecast(investor_user.pk, limit=1)
+    return top[0].product.name if top else "Not enough data"
+
+def _dashboard_queries(user):
+    """The dashboard's aggregate and querysets, shared by the sync and async paths."""
+    # 1. Payment method totals + owner income in ONE conditional aggregate (daily rollup)
+    totals = {
+        'cash': Sum('revenue', filter=Q(payment_method='CASH')),
+        'card': Sum('revenue', filter=Q(payment_method='CARD')),
+        'online': Sum('revenue', filter=Q(payment_method='ONLINE')),
+        'owner_net': Sum('owner_profit'),
+    }
+
+    # 2. Earned / Paid / Due for ALL investors from the running balances (one JOIN)
+    money = DecimalField(max_digits=12, decimal_places=2)
+    investors = User.objects.filter(role='INVESTOR').annotate(
+        earned=Coalesce('balance__earned', Value(Decimal(0)), output_field=money),
+        paid=Coalesce('balance__paid', Value(Decimal(0)), output_field=money),
+        owed=Coalesce('balance__due', Value(Decimal(0)), output_field=money),
+    )
+
+    # 3. Champions (Store-wide + Logged-in user's best seller)
+    global_stat = SalesDailyRollup.objects.values('product__name').annotate(
+        total_qty=Sum('quantity')
+    ).order_by('-total_qty')
+    my_stat = SalesDailyRollup.objects.filter(investor=user).values('product__name').annotate(
+        total_qty=Sum('quantity')
+    ).order_by('-total_qty')
+    return totals, investors, global_stat, my_stat
+
+def _dashboard_stats(user, totals, investors, global_stat, my_stat):
+    """Shapes the fetched dashboard rows into the template context."""
+    cash_income = totals['cash'] or 0
+    card_income = totals['card'] or 0
+    online_income = totals['online'] or 0
+
+    payment_stats = {
+        'cash': round(cash_income, 2),
+        'card': round(card_income, 2),
+        'online': round(online_income, 2),
+        'total': round(cash_income + card_income + online_income, 2)
+    }
+
+    financials = []
+    my_wallet = {'earned': 0, 'paid': 0, 'due': 0}
+    for inv in investors:
+        row = {
+            'investor': inv,
+            'earned': round(inv.earned, 2),
+            'paid': round(inv.paid, 2),
+            'due': round(inv.owed, 2)
+        }
+        financials.append(row)
+        if inv.pk == user.pk:
+            my_wallet = row
+
+    return {
+        'payment_stats': payment_stats,
+        'owner_net_income': round(totals['owner_net'] or 0, 2),
+        'financials': financials,
+        'total_earned': my_wallet['earned'],
+        'total_paid': my_wallet['paid'],
+        'due': my_wallet['due'],
+        'global_champion': global_stat['product__name'] if global_stat else "No Sales Yet",
+        'my_champion': my_stat['product__name'] if my_stat else "No Sales Yet",
+    }
+
+def get_dashboard_stats(user):
+    """Computes every dashboard figure in a fixed number of grouped queries."""
+    totals, investors, global_stat, my_stat = _dashboard_queries(user)
+    return _dashboard_stats(
+        user, SalesDailyRollup.objects.aggregate(**totals), list(investors), global_stat.first(), my_stat.first()
+    )
+
+async def aget_dashboard_stats(user):
+    """Async (ASGI) version of get_dashboard_stats(): same queries and shape, async ORM."""
+    totals, investors, global_stat, my_stat = _dashboard_queries(user)
+    return _dashboard_stats(
+        user, await SalesDailyRollup.objects.aaggregate(**totals), [inv async for inv in investors],
+        await global_stat.afirst(), await my_stat.afirst()
+    )
+
+def get_period_start(filter_type):
+    """Maps the today/week/month/year filter to its first local day (None = all time)."""
+    days = {'today': 0, 'week': 7, 'month': 30, 'year': 365}
+    if filter_type not in days:
+        return None
+    return timezone.localdate() - timedelta(days=days[filter_type])
+
+def get_period_range(filter_type):
+    """
+    Timezone-aware [start, end) datetimes for the period filter (None = all time).
+    Filtering with `date >= start AND date < end` keeps the column bare, so the
+    database can use its index (unlike `date__date`, which wraps it in a cast).
+    """
+    start_day = get_period_start(filter_type)
+    if start_day is None:
+        return None
+    start = timezone.make_aware(datetime.combine(start_day, time.min))
+    end = timezone.make_aware(datetime.combine(timezone.localdate() + timedelta(days=1), time.min))
+    return start, end
+
+def filter_by_period(queryset, filter_type, field='date'):
+    """Applies the today/week/month/year filter as a sargable range on `field`."""
+    period = get_period_range(filter_type)
+    if period is None:
+        return queryset
+    start, end = period
+    return queryset.filter(**{f'{field}__gte': start, f'{field}__lt': end})
+
+def get_sales_totals(start_day=None, investor_id=None):
+    """Revenue and number of sales for a period, answered from the daily rollup."""
+    rollup = SalesDailyRollup.objects.all()
+    if start_day:
+        rollup = rollup.filter(day__gte=start_day)
+    if investor_id:
+        rollup = rollup.filter(investor_id=investor_id)
+
+    totals = rollup.aggregate(revenue=Sum('revenue'), count=Sum('sale_count'))
+    return totals['revenue'] or 0, totals['count'] or 0
+
+def filter_inventory(queryset, params):
+    """Applies the inventory_list search box and owner filter from `params`."""
+    search_query = (params.get('search') or '').strip()
+    filter_investor = params.get('investor')
+
+    if search_query:
+        # Trigram index narrows the candidates before the name / product_id match
+        queryset = filter_search(queryset, 'P', search_query)
+    if filter_investor and filter_investor != 'all':
+        queryset = queryset.filter(investor_id=filter_investor)
+    return queryset
+
+def get_inventory_valuation(products):
+    """Stock value (cost x quantity) and product count for a product queryset in ONE aggregate."""
+    money = DecimalField(max_digits=14, decimal_places=2)
+    totals = products.aggregate(
+        total_value=Coalesce(Sum(F('buying_price') * F('quantity'), output_field=money), Value(Decimal(0)), output_field=money),
+        product_count=Count('id'),
+    )
+    return round(totals['total_value'], 2), totals['product_count']
+
+def get_investor_valuations(investor_id=None):
+    """Per-owner stock summary (GROUP BY investor): products, units, cost and retail value."""
+    money = DecimalField(max_digits=14, decimal_places=2)
+    products = Product.objects.all()
+    if investor_id:
+        products = products.filter(investor_id=investor_id)
+
+    return list(products.values('investor_id', 'investor__username').annotate(
+        product_count=Count('id'),
+        units=Coalesce(Sum('quantity'), 0),
+        stock_value=Sum(F('buying_price') * F('quantity'), output_field=money),
+        retail_value=Sum(F('selling_price') * F('quantity'), output_field=money),
+        low_stock_count=Count('id', filter=Q(quantity__lte=F('low_stock_threshold'))),
+    ).order_by('investor__username'))
+
+def get_purchase_timeline(customer, after=None, before=None, page_size=20):
+    """
+    One page of a customer's receipts (sales grouped by transaction_id), newest
+    first, with their line items loaded in one extra query.
+    Returns (receipts, next_cursor, prev_cursor).
+    """
+    # Sales recorded before receipts existed have no transaction_id: each is its own receipt
+    receipt_key = Coalesce('transaction_id', Concat(Value('#'), Cast('id', CharField())))
+    receipts = Sale.objects.filter(customer=customer).order_by().annotate(receipt=receipt_key).values('receipt').annotate(
+        last_date=Max('date'),
+        total=Sum('total_amount'),
+        item_count=Sum('quantity'),
+        method=Max('payment_method'),
+    )
+    page, next_cursor, prev_cursor = keyset_page(
+        receipts, after=after, before=before, page_size=page_size, keys=('last_date', 'receipt')
+    )
+
+    # Line items for just this page (product names via JOIN, no per-row queries)
+    trans_ids = [r['receipt'] for r in page if not r['receipt'].startswith('#')]
+    legacy_ids = [int(r['receipt'][1:]) for r in page if r['receipt'].startswith('#')]
+    lines = Sale.objects.filter(customer=customer).filter(
+        Q(transaction_id__in=trans_ids) | Q(pk__in=legacy_ids)
+    ).select_related('product').order_by('id')
+
+    by_receipt = {}
+    for sale in lines:
+        by_receipt.setdefault(sale.transaction_id or f"#{sale.pk}", []).append(sale)
+    for receipt in page:
+        receipt['lines'] = by_receipt.get(receipt['receipt'], [])
+    return page, next_cursor, prev_cursor
@@ -0,0 +1,131 @@
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F, Case, When, Value, TextField
+from django.utils import timezone
+
+from .models import Product, ProductChangeRequest
+from .catalog import product_index
+from .search import reindex_objects
+from .analytics import invalidate_top_products
+
+EDIT_FIELDS = ['name', 'quantity', 'buying_price', 'selling_price', 'low_stock_threshold', 'updated_at']
+# The request fields copied onto the product, checked before anything is written
+REQUEST_FIELDS = ['name', 'quantity', 'buying_price', 'selling_price', 'low_stock_threshold']
+
+def request_errors(req):
+    """Why `req` cannot be applied (field validation), or None if it is valid."""
+    try:
+        req.clean_fields(exclude=[f.name for f in req._meta.fields if f.name not in REQUEST_FIELDS])
+    except ValidationError as e:
+        return "; ".join(f"{field}: {' '.join(msgs)}" for field, msgs in e.message_dict.items())
+    return None
+
+def approve_requests(requests):
+    """
+    Applies every PENDING request in `requests` set-wise, in one transaction:
+    one bulk_create for NEW listings, one bulk_update for EDITs and one
+    UPDATE for all statuses. Requests that fail validation are rejected on
+    their own (with the reason in admin_note) and the rest still apply.
+    Returns one result dict per request.
+    """
+    now = timezone.now()
+    report = []
+
+    with transaction.atomic():
+        # 1. Lock the pending rows so two owners cannot approve the same batch twice
+        pending = list(
+            requests.filter(status='PENDING')
+            .select_related('requester', 'target_product')
+            .select_for_update(of=('self',))
+            .order_by('created_at', 'id')
+        )
+        if not pending:
+            return report
+
+        # Invalid data would fail the bulk writes for the whole batch: reject just those requests
+        rejected = {}
+        for req in pending:
+            error = request_errors(req)
+            if error:
+                rejected[req.id] = error
+
+        new_requests = [req for req in pending if req.request_type == 'NEW' and req.id not in rejected]
+        edit_requests = [req for req in pending if req.request_type == 'EDIT' and req.id not in rejected]
+
+        # 2. NEW: pre-generated product IDs + one bulk INSERT
+        codes = Product.generate_product_ids([req.requester.username for req in new_requests])
+        new_products = [
+            Product(
+                investor=req.requester,
+                product_id=code,
+                name=req.name,
+                quantity=req.quantity,
+                buying_price=req.buying_price,
+                selling_price=req.selling_price,
+                low_stock_threshold=req.low_stock_threshold,
+                owner_split_percent=30,
+                investor_split_percent=70
+            )
+            for req, code in zip(new_requests, codes)
+        ]
+        Product.objects.bulk_create(new_products)
+
+        # 3. EDIT: later requests for the same product win, one bulk UPDATE
+        latest_edit = {}
+        for req in edit_requests:
+            if req.target_product is None:
+                rejected[req.id] = "Target product no longer exists"
+            else:
+                latest_edit[req.target_product_id] = req
+
+        edited_products = []
+        for req in latest_edit.values():
+            p = req.target_product
+            p.name = req.name
+            p.quantity = req.quantity
+            p.buying_price = req.buying_price
+            p.selling_price = req.selling_price
+            p.low_stock_threshold = req.low_stock_threshold
+            p.updated_at = now  # bulk_update skips auto_now
+            edited_products.append(p)
+        Product.objects.bulk_update(edited_products, EDIT_FIELDS)
+
+        # 4. All statuses in one UPDATE
+        changes = {'status': Value('APPROVED')}
+        if rejected:
+            changes['status'] = Case(When(pk__in=list(rejected), then=Value('REJECTED')), default=Value('APPROVED'))
+            changes['admin_note'] = Case(
+                *[When(pk=pk, then=Value(note)) for pk, note in rejected.items()],
+                default=F('admin_note'),
+                output_field=TextField()
+            )
+        ProductChangeRequest.objects.filter(pk__in=[req.id for req in pending]).update(**changes)
+
+        # 5. Bulk writes skip post_save: refresh the search index in the same transaction
+        created = dict(Product.objects.filter(product_id__in=codes).values_list('product_id', 'pk'))
+        reindex_objects('P', list(created.values()) + [p.pk for p in edited_products])
+
+    # 6. This worker's scan index + cached best sellers (other workers repair stale scan entries on lookup)
+    for p in new_products:
+        product_index.add(created[p.product_id], p.product_id, p.name)
+    for p in edited_products:
+        product_index.add(p.pk, p.product_id, p.name)
+    if edited_products:
+        invalidate_top_products({p.investor_id for p in edited_products})
+
+    # 7. Per-request report
+    new_codes = dict(zip([req.id for req in new_requests], codes))
+    winners = {req.id for req in latest_edit.values()}
+    for req in pending:
+        row = {'id': req.id, 'type': req.request_type, 'name': req.name, 'requester': req.requester.username}
+        if req.id in rejected:
+            row.update(outcome='REJECTED', note=rejected[req.id])
+        elif req.request_type == 'NEW':
+            row.update(outcome='CREATED', product_id=new_codes[req.id])
+        elif req.id in winners:
+            row.update(outcome='UPDATED', product_id=req.target_product.product_id)
+        else:
+            row.update(outcome='SUPERSEDED', product_id=req.target_product.product_id,
+                       note="A later request for this product was applied")
+        report.append(row)
+    return report
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class StoreConfig(AppConfig):
     name = 'store'
+
+    def ready(self):
+        # Registers the signal handlers (scan / search indexes, ledger totals on deletes)
+        from . import signals  # noqa: F401
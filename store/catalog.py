@@ -0,0 +1,208 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q, Max
+from django.db.models.functions import Lower
+
+from .models import Product, DeletedProduct
+
+SUMMARY_FIELDS = ('id', 'name', 'selling_price', 'quantity', 'product_id')
+
+def product_summary(row):
+    """The JSON shape the POS cart expects for one product."""
+    return {
+        'id': row['id'],
+        'name': row['name'],
+        'price': float(row['selling_price']),
+        'stock': row['quantity'],
+        'custom_id': row['product_id']
+    }
+
+class ProductLookupIndex:
+    """
+    Per-worker map of normalized product_id / name -> product pk for the scan API.
+
+    The index only resolves WHICH product a scan refers to; price and stock are
+    read with a primary-key lookup so they are never stale. It is filled on
+    demand: a miss (or an entry that no longer matches its row) falls back to
+    an indexed LOWER(product_id) / LOWER(name) query and stores the answer,
+    and Product save/delete signals keep this process's entries warm. Codes
+    the database does not know (mistyped or foreign barcodes) are remembered
+    for `miss_ttl` seconds so repeated bad scans cost no query at all.
+    """
+    MAX_MISSES = 10000
+
+    def __init__(self, miss_ttl=None):
+        self.miss_ttl = miss_ttl if miss_ttl is not None else getattr(settings, 'PRODUCT_LOOKUP_MISS_TTL', 30)
+        self._lock = threading.Lock()
+        self._keys = {}      # normalized key -> pk
+        self._owned = {}     # pk -> keys it was indexed under
+        self._misses = {}    # normalized key -> monotonic expiry
+
+    @staticmethod
+    def normalize(value):
+        return (value or '').strip().lower()
+
+    def invalidate(self):
+        """Forgets every entry; lookups refill the index from the database."""
+        with self._lock:
+            self._keys, self._owned, self._misses = {}, {}, {}
+
+    def add(self, pk, code, name):
+        with self._lock:
+            self._discard(pk)
+            self._owned[pk] = {k for k in (self.normalize(code), self.normalize(name)) if k}
+            for key in self._owned[pk]:
+                self._misses.pop(key, None)
+                current = self._keys.get(key)
+                if current is None or pk < current:
+                    self._keys[key] = pk
+
+    def discard(self, pk):
+        with self._lock:
+            self._discard(pk)
+
+    def _discard(self, pk):
+        for key in self._owned.pop(pk, ()):
+            if self._keys.get(key) == pk:
+                del self._keys[key]
+
+    def resolve(self, key):
+        return self._keys.get(key)
+
+    def is_known_miss(self, key):
+        expires = self._misses.get(key)
+        return expires is not None and expires > time.monotonic()
+
+    def remember_miss(self, key):
+        with self._lock:
+            if len(self._misses) >= self.MAX_MISSES:
+                self._misses.clear()
+            self._misses[key] = time.monotonic() + self.miss_ttl
+
+    @staticmethod
+    def find_rows(keys):
+        """Products whose lowercased product_id or name is one of `keys` (answered by the LOWER() indexes)."""
+        return Product.objects.annotate(
+            code_key=Lower('product_id'), name_key=Lower('name')
+        ).filter(
+            Q(code_key__in=keys) | Q(name_key__in=keys)
+        ).order_by('pk').values(*SUMMARY_FIELDS)
+
+    def lookup(self, query):
+        """Returns the product summary for a scanned code / typed name, or None."""
+        key = self.normalize(query)
+        if not key or self.is_known_miss(key):
+            return None
+
+        pk = self.resolve(key)
+        if pk is not None:
+            row = Product.objects.filter(pk=pk).values(*SUMMARY_FIELDS).first()
+            if row and key in (self.normalize(row['product_id']), self.normalize(row['name'])):
+                return product_summary(row)
+
+        # Miss or stale entry: ask the database and repair the index
+        row = self.find_rows([key]).first()
+
+        if row:
+            self.add(row['id'], row['product_id'], row['name'])
+            return product_summary(row)
+        if pk is not None:
+            with self._lock:
+                self._keys.pop(key, None)
+        self.remember_miss(key)
+        return None
+
+    async def alookup(self, query):
+        """lookup() for ASGI views, run in the sync worker thread."""
+        return await sync_to_async(self.lookup)(query)
+
+    def lookup_many(self, queries):
+        """
+        Resolves a basket of codes / names at once: one primary-key query for
+        everything the index knows plus at most one fallback query for the rest.
+        Returns {normalized query: summary or None}.
+        """
+        keys = list(dict.fromkeys(k for k in map(self.normalize, queries) if k))
+        results = dict.fromkeys(keys)
+        if not keys:
+            return results
+
+        candidates = {key: self.resolve(key) for key in keys}
+        rows = Product.objects.filter(
+            pk__in={pk for pk in candidates.values() if pk is not None}
+        ).values(*SUMMARY_FIELDS)
+        by_pk = {row['id']: row for row in rows}
+
+        for key, pk in candidates.items():
+            row = by_pk.get(pk)
+            if row and key in (self.normalize(row['product_id']), self.normalize(row['name'])):
+                results[key] = product_summary(row)
+
+        # Misses / stale entries: one case-insensitive query for all of them
+        missing = [key for key in keys if results[key] is None and not self.is_known_miss(key)]
+        if missing:
+            for row in self.find_rows(missing):
+                self.add(row['id'], row['product_id'], row['name'])
+                for key in (self.normalize(row['product_id']), self.normalize(row['name'])):
+                    if key in results and results[key] is None:
+                        results[key] = product_summary(row)
+            for key in missing:
+                if results[key] is None:
+                    self.remember_miss(key)
+
+        return results
+
+# One index per worker process
+product_index = ProductLookupIndex()
+
+
+# ==========================================
+# OFFLINE POS CATALOG (versioned snapshot + deltas)
+# ==========================================
+CATALOG_FIELDS = ['id', 'custom_id', 'name', 'price', 'stock']
+
+# Deltas re-send this much history so rows committed slightly after the
+# client's version stamp (long-running transactions) are never skipped.
+CATALOG_DELTA_OVERLAP = timedelta(seconds=60)
+
+def to_version(moment):
+    return int(moment.timestamp() * 1_000_000) if moment else 0
+
+def from_version(version):
+    return datetime.fromtimestamp(version / 1_000_000, tz=dt_timezone.utc)
+
+def get_catalog_version():
+    """Opaque catalog version: the latest product change or deletion, in microseconds."""
+    changed = Product.objects.aggregate(t=Max('updated_at'))['t']
+    deleted = DeletedProduct.objects.aggregate(t=Max('deleted_at'))['t']
+    return max(to_version(changed), to_version(deleted))
+
+def get_catalog_bundle(since=None):
+    """
+    Compact catalog for client-side lookups. Without `since` (or when the
+    client is already current) returns a full snapshot / empty delta; otherwise
+    only the rows changed and the ids deleted since that version.
+    """
+    version = get_catalog_version()
+    bundle = {'version': version, 'fields': CATALOG_FIELDS, 'full': since is None, 'rows': [], 'deleted': []}
+    if since is not None and since >= version:
+        return bundle
+
+    products = Product.objects.order_by('pk')
+    if since is not None:
+        cutoff = from_version(since) - CATALOG_DELTA_OVERLAP
+        products = products.filter(updated_at__gte=cutoff)
+        bundle['deleted'] = list(
+            DeletedProduct.objects.filter(deleted_at__gte=cutoff).values_list('product_pk', flat=True)
+        )
+
+    bundle['rows'] = [
+        [pk, code, name, float(price), qty]
+        for pk, code, name, price, qty in products.values_list(
+            'pk', 'product_id', 'name', 'selling_price', 'quantity'
+        ).iterator(chunk_size=5000)
+    ]
+    return bundle
@@ -0,0 +1,86 @@
+import uuid
+from decimal import Decimal
+from django.db import transaction
+from django.utils import timezone
+from django.db.models import F, Case, When, Value, IntegerField
+
+from .models import Product, Sale, OutOfStockError
+
+def checkout(cart_items, seller, payment_method='CASH', discount_percent=Decimal(0),
+             customer=None, customer_name=None, customer_contact=None):
+    """
+    Records a whole cart as one transaction using set-based queries:
+    one SELECT for the products, one guarded UPDATE reserving every stock
+    decrement and one bulk INSERT for the sale lines.
+    Returns (transaction_id, sales); raises OutOfStockError if any product is short.
+    """
+    # 1. Normalize the cart lines
+    lines = []
+    for item in cart_items:
+        qty = int(item['quantity'])
+        if qty < 1:
+            raise ValueError("Quantity must be at least 1")
+        lines.append((int(item['product_id']), qty))
+
+    if not lines:
+        raise ValueError("Cart is empty")
+
+    trans_id = str(uuid.uuid4())[:8].upper()
+
+    with transaction.atomic():
+        # 2. Load every cart product in ONE query
+        products = Product.objects.in_bulk({pid for pid, _ in lines})
+
+        # 3. Total quantity per product (a product may appear on several lines)
+        wanted = {}
+        for pid, qty in lines:
+            if pid not in products:
+                raise ValueError("Product not found")
+            wanted[pid] = wanted.get(pid, 0) + qty
+
+        # 4. Reserve stock with ONE guarded UPDATE: rows without enough units
+        #    are skipped by the WHERE clause, so concurrent tills can never oversell
+        decrement = Case(
+            *[When(id=pid, then=Value(qty)) for pid, qty in wanted.items()],
+            output_field=IntegerField()
+        )
+        with transaction.atomic():
+            reserved = Product.objects.filter(id__in=wanted, quantity__gte=decrement).update(
+                quantity=F('quantity') - decrement, updated_at=timezone.now()
+            )
+            if reserved != len(wanted):
+                # Undo the partial reservation (savepoint) before reading stock levels
+                transaction.set_rollback(True)
+
+        if reserved != len(wanted):
+            available = dict(Product.objects.filter(id__in=wanted).values_list('id', 'quantity'))
+            raise OutOfStockError([
+                (products[pid].name, available.get(pid, 0), qty)
+                for pid, qty in wanted.items()
+                if available.get(pid, 0) < qty
+            ])
+
+        # 5. Price every line in memory (same maths as Sale.save)
+        sales = []
+        for pid, qty in lines:
+            sale = Sale(
+                transaction_id=trans_id,
+                product=products[pid],
+                sold_by=seller,
+                quantity=qty,
+                discount_percent=discount_percent,
+                payment_method=payment_method,
+                customer=customer,
+                customer_name_text=customer_name or "Walk-in",
+                customer_contact=customer_contact
+            )
+            sale.calculate_amounts()
+            sales.append(sale)
+
+        # 6. One INSERT for all lines
+        Sale.objects.bulk_create(sales)
+
+        # 7. Running balances & daily rollups (bulk_create skips Sale.save)
+        Sale.record_batch_totals(sales)
+
+    return trans_id, sales
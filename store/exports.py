@@ -0,0 +1,203 @@
+import csv
+import zlib
+from datetime import timedelta
+from pathlib import Path
+from django.conf import settings
+from django.utils import timezone
+
+from .analytics import filter_by_period, filter_inventory
+from .restock import filter_restock
+from .models import Product, Sale, ExportJob, RestockRecommendation
+
+EXPORT_CHUNK_SIZE = 2000   # rows fetched per database round trip
+ROWS_PER_WRITE = 500       # CSV rows joined into one response chunk
+
+class Echo:
+    """File-like object whose write() just hands the line back (csv.writer -> generator)."""
+    def write(self, value):
+        return value
+
+# ==========================================
+# ROW GENERATORS (constant memory: values_list + iterator)
+# ==========================================
+def sales_csv_rows(params):
+    """Header + one row per sale matching the sales_history filters in `params`."""
+    yield ['Date', 'Transaction ID', 'Product', 'Sold By', 'Customer', 'Qty', 'Total Amount', 'Payment Method']
+
+    sales = Sale.objects.order_by('-date', '-id')
+    filter_investor_id = params.get('investor')
+    if filter_investor_id and filter_investor_id != 'all':
+        sales = sales.filter(product__investor_id=filter_investor_id)
+    sales = filter_by_period(sales, params.get('filter'))
+
+    methods = dict(Sale.PAYMENT_METHODS)
+    rows = sales.values_list(
+        'date', 'transaction_id', 'product__name', 'sold_by__username',
+        'customer__name', 'customer_name_text', 'quantity', 'total_amount', 'payment_method'
+    )
+    for date, trans_id, product, seller, customer, customer_text, qty, total, method in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [
+            # Convert UTC to Local Time before writing
+            timezone.localtime(date).strftime("%Y-%m-%d %I:%M %p"),
+            trans_id or "-",
+            product or "-",
+            seller or "-",
+            customer or customer_text or "Walk-in",
+            qty,
+            total,
+            methods.get(method, method),
+        ]
+
+def inventory_csv_rows(params):
+    """Header + one row per product matching the inventory_list search / owner filters in `params`."""
+    yield ['Product ID', 'Name', 'Owner', 'Cost Price', 'Selling Price', 'Quantity', 'Stock Status', 'Total Stock Value']
+
+    products = filter_inventory(Product.objects.order_by('-created_at'), params)
+
+    rows = products.values_list(
+        'product_id', 'name', 'investor__username', 'buying_price', 'selling_price', 'quantity', 'low_stock_threshold'
+    )
+    for code, name, owner, cost, price, qty, threshold in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [
+            code, name, owner, cost, price, qty,
+            "Low Stock" if qty <= threshold else "In Stock",
+            cost * qty,
+        ]
+
+def restock_csv_rows(params):
+    """Header + one row per recommendation matching the restock_list owner / status filters in `params`."""
+    yield ['Product ID', 'Name', 'Owner', 'Status', 'Stock', 'Units / Day', 'Days of Cover', 'Reorder Point', 'Reorder Qty', 'Computed At']
+
+    recommendations = filter_restock(RestockRecommendation.objects.all(), params)
+
+    statuses = dict(RestockRecommendation.STATUS_CHOICES)
+    rows = recommendations.values_list(
+        'product__product_id', 'product__name', 'product__investor__username', 'status', 'stock',
+        'velocity', 'days_of_cover', 'reorder_point', 'reorder_qty', 'computed_at'
+    )
+    for code, name, owner, status, stock, velocity, cover, point, qty, computed in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [
+            code, name, owner, statuses.get(status, status), stock, velocity,
+            "-" if cover is None else cover, point, qty,
+            timezone.localtime(computed).strftime("%Y-%m-%d %I:%M %p"),
+        ]
+
+# ==========================================
+# ENCODING
+# ==========================================
+def iter_csv(rows):
+    """Encodes rows as CSV text, batching ROWS_PER_WRITE lines per chunk."""
+    writer = csv.writer(Echo())
+    batch = []
+    for row in rows:
+        batch.append(writer.writerow(row))
+        if len(batch) >= ROWS_PER_WRITE:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+def iter_gzip(chunks):
+    compressor = zlib.compressobj(wbits=31)  # 31 = gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+# ==========================================
+# EXPORT JOBS (run by `manage.py run_export_jobs`)
+# ==========================================
+EXPORT_ROWS = {
+    'SALES': sales_csv_rows,
+    'INVENTORY': inventory_csv_rows,
+    'RESTOCK': restock_csv_rows,
+}
+
+# Only these query-string keys are captured into a job
+EXPORT_PARAMS = {
+    'SALES': ('investor', 'filter', 'gzip'),
+    'INVENTORY': ('search', 'investor', 'gzip'),
+    'RESTOCK': ('investor', 'status', 'gzip'),
+}
+
+def export_root():
+    return Path(getattr(settings, 'EXPORT_ROOT', Path(settings.BASE_DIR) / 'exports'))
+
+def capture_params(kind, query):
+    return {key: query[key] for key in EXPORT_PARAMS[kind] if query.get(key)}
+
+def export_job_timeout():
+    """Seconds a RUNNING job may take before its worker is presumed dead."""
+    return getattr(settings, 'EXPORT_JOB_TIMEOUT', 30 * 60)
+
+def export_filename(job):
+    stamp = timezone.localtime(job.created_at).strftime("%Y-%m-%d_%H-%M")
+    return f"{job.kind.lower()}_report_{stamp}_{job.pk}.csv" + (".gz" if job.params.get('gzip') == '1' else "")
+
+def reclaim_stale_jobs():
+    """
+    Fails jobs left RUNNING by a worker that crashed or was killed (older than
+    export_job_timeout()) and removes their partial files. Returns how many.
+    """
+    cutoff = timezone.now() - timedelta(seconds=export_job_timeout())
+    stale = list(ExportJob.objects.filter(status='RUNNING', started_at__lt=cutoff))
+    for job in stale:
+        claimed = ExportJob.objects.filter(pk=job.pk, status='RUNNING').update(
+            status='FAILED', error="The export worker stopped before finishing. Please request the report again.",
+            finished_at=timezone.now()
+        )
+        if claimed:
+            (export_root() / (export_filename(job) + '.part')).unlink(missing_ok=True)
+    return len(stale)
+
+def claim_next_job():
+    """Atomically moves the oldest queued job to RUNNING (safe with several workers)."""
+    for job in ExportJob.objects.filter(status='PENDING').order_by('created_at')[:10]:
+        claimed = ExportJob.objects.filter(pk=job.pk, status='PENDING').update(
+            status='RUNNING', started_at=timezone.now()
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+    return None
+
+def run_export_job(job):
+    """Writes the job's CSV to EXPORT_ROOT (temp file + rename) and records the outcome."""
+    gzip = job.params.get('gzip') == '1'
+    filename = export_filename(job)
+
+    root = export_root()
+    root.mkdir(parents=True, exist_ok=True)
+    target = root / filename
+    partial = root / (filename + '.part')
+
+    written = [0]
+
+    def counted(rows):
+        for row in rows:
+            written[0] += 1
+            yield row
+
+    try:
+        chunks = iter_csv(counted(EXPORT_ROWS[job.kind](job.params)))
+        with open(partial, 'wb') as fh:
+            if gzip:
+                for data in iter_gzip(chunks):
+                    fh.write(data)
+            else:
+                for chunk in chunks:
+                    fh.write(chunk.encode())
+        partial.replace(target)
+
+        job.status = 'DONE'
+        job.file_path = str(target)
+        job.row_count = max(written[0] - 1, 0)  # minus the header
+    except Exception as e:
+        partial.unlink(missing_ok=True)
+        job.status = 'FAILED'
+        job.error = str(e)
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'file_path', 'row_count', 'error', 'finished_at'])
+    return job
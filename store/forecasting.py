@@ -0,0 +1,113 @@
+import numpy as np
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import Product, SalesDailyRollup, ProductForecast
+
+HISTORY_DAYS = 90         # days of daily sales fed to the model
+WARMUP_DAYS = 7           # first days only seed the level (mean of the week)
+HORIZON_DAYS = 30         # longest stored forecast
+ALPHAS = np.array([0.05, 0.1, 0.2, 0.3, 0.5, 0.7])  # level smoothing candidates, best one kept per product
+BETA = 0.1                # trend smoothing
+PHI = 0.9                 # trend damping (flattens the trend further out)
+WRITE_BATCH = 2000
+
+# ==========================================
+# 1. PRODUCT x DAY MATRIX
+# ==========================================
+def load_sales_matrix(history_days=HISTORY_DAYS, end_day=None, products=None):
+    """
+    (product_ids, matrix) with matrix[i, d] = units of product_ids[i] sold on day d,
+    from ONE grouped query on the daily rollup. Only products with sales in the window get a row.
+    The window ends yesterday by default (today is still incomplete); `products` (a Product
+    queryset) limits the rows.
+    """
+    end_day = end_day or timezone.localdate() - timedelta(days=1)
+    start_day = end_day - timedelta(days=history_days - 1)
+
+    rollup = SalesDailyRollup.objects.filter(day__gte=start_day, day__lte=end_day, product__isnull=False)
+    if products is not None:
+        rollup = rollup.filter(product__in=products.values('pk'))
+
+    rows = rollup.values('product_id', 'day').annotate(qty=Sum('quantity')).values_list('product_id', 'day', 'qty').order_by()
+    rows = list(rows)
+    if not rows:
+        return np.array([], dtype=np.int64), np.zeros((0, history_days))
+
+    product_ids, days, quantities = zip(*rows)
+    ids, row_index = np.unique(np.array(product_ids, dtype=np.int64), return_inverse=True)
+    col_index = np.array([(day - start_day).days for day in days])
+
+    matrix = np.zeros((len(ids), history_days))
+    np.add.at(matrix, (row_index, col_index), np.array(quantities, dtype=float))
+    return ids, matrix
+
+# ==========================================
+# 2. MODEL (damped-trend exponential smoothing, all products at once)
+# ==========================================
+def fit_smoothing(matrix, alphas=ALPHAS, beta=BETA, phi=PHI):
+    """
+    Runs damped Holt smoothing for every product and every candidate alpha in one pass
+    over the days (arrays are products x alphas) and keeps the alpha with the lowest
+    one-step-ahead squared error per product. Returns (level, trend, alpha, rmse), one value per row.
+    """
+    products, days = matrix.shape
+    warmup = min(WARMUP_DAYS, days - 1)
+
+    level = np.repeat(matrix[:, :warmup].mean(axis=1, keepdims=True), len(alphas), axis=1)
+    trend = np.zeros_like(level)
+    sse = np.zeros_like(level)
+
+    for day in range(warmup, days):
+        predicted = level + phi * trend
+        error = matrix[:, day, None] - predicted
+        sse += error ** 2
+
+        new_level = predicted + alphas * error
+        trend = beta * (new_level - level) + (1 - beta) * phi * trend
+        level = new_level
+
+    best = sse.argmin(axis=1)
+    rows = np.arange(products)
+    rmse = np.sqrt(sse[rows, best] / max(days - warmup, 1))
+    return level[rows, best], trend[rows, best], alphas[best], rmse
+
+def project(level, trend, horizon=HORIZON_DAYS, phi=PHI):
+    """Daily forecasts (products x horizon), never below zero."""
+    damping = np.cumsum(phi ** np.arange(1, horizon + 1))
+    return np.clip(level[:, None] + damping[None, :] * trend[:, None], 0, None)
+
+# ==========================================
+# 3. REFRESH (run by `manage.py refresh_forecasts`)
+# ==========================================
+def refresh_forecasts(history_days=HISTORY_DAYS):
+    """Recomputes every product's forecast and replaces the ProductForecast table. Returns the row count."""
+    ids, matrix = load_sales_matrix(history_days)
+    forecasts = []
+    if len(ids):
+        level, trend, alpha, rmse = fit_smoothing(matrix)
+        path = project(level, trend)
+        now = timezone.now()
+        forecasts = [
+            ProductForecast(
+                product_id=int(pid),
+                daily_rate=round(float(max(level[i], 0)), 3),
+                trend=round(float(trend[i]), 3),
+                next_7_days=round(float(path[i, :7].sum()), 2),
+                next_30_days=round(float(path[i].sum()), 2),
+                alpha=float(alpha[i]),
+                error=round(float(rmse[i]), 3),
+                generated_at=now,
+            )
+            for i, pid in enumerate(ids)
+        ]
+
+    with transaction.atomic():
+        # Skip products deleted since the rollup was read (the foreign key would fail)
+        live = set(Product.objects.values_list('pk', flat=True))
+        forecasts = [f for f in forecasts if f.product_id in live]
+        ProductForecast.objects.all().delete()
+        ProductForecast.objects.bulk_create(forecasts, batch_size=WRITE_BATCH)
+    return len(forecasts)
@@ -0,0 +1,185 @@
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY, BACKEND_SESSION_KEY, HASH_SESSION_KEY
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, OperationalError
+from django.db.models import Sum
+from store.checkout import checkout
+from store.models import User, Product, Sale, OutOfStockError
+
+class Command(BaseCommand):
+    help = (
+        'Fires concurrent requests at running servers and reports throughput / latency. '
+        'Run it against the WSGI (gunicorn) and ASGI (gunicorn -k uvicorn.workers.UvicornWorker) '
+        'deployments to compare them, e.g. --url http://127.0.0.1:8000 --url http://127.0.0.1:8001. '
+        'With --checkout, instead hammers one scratch product from many in-process tills and reports '
+        'checkout throughput, failing if stock is ever oversold (writes to the configured database).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', action='append', help='Base URL of a running server (repeatable)')
+        parser.add_argument('--path', action='append', help='Path to hit (repeatable, defaults to the sync + async lookup/stats endpoints)')
+        parser.add_argument('--user', help='Username to authenticate as (default: first OWNER)')
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--requests', type=int, default=400, help='Requests per URL x path')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+        parser.add_argument('--checkout', action='store_true', help='Benchmark concurrent checkouts of one product instead of HTTP endpoints')
+        parser.add_argument('--tills', type=int, default=8, help='--checkout: concurrent tills')
+        parser.add_argument('--per-till', type=int, default=50, help='--checkout: single-unit checkouts per till')
+        parser.add_argument('--stock', type=int, help='--checkout: units in stock (default: half of all checkouts)')
+
+    def handle(self, *args, **options):
+        if options['checkout']:
+            return self.bench_checkout(options)
+        if not options['url']:
+            raise CommandError('Pass at least one --url (or --checkout).')
+
+        user = self.get_user(options['user'])
+        cookie = f'{settings.SESSION_COOKIE_NAME}={self.create_session(user)}'
+
+        paths = options['path']
+        if not paths:
+            product = Product.objects.order_by('pk').first()
+            code = product.product_id if product else 'missing'
+            paths = [
+                f'/api/product-lookup/?q={code}',
+                f'/api/async/product-lookup/?q={code}',
+                '/api/async/dashboard-stats/',
+            ]
+
+        report = []
+        for base in options['url']:
+            for path in paths:
+                report.append(self.run(base.rstrip('/') + path, cookie, options['concurrency'], options['requests']))
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(f"{'URL':<70} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+        for row in report:
+            self.stdout.write(
+                f"{row['url']:<70} {row['rps']:>8.1f} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['errors']:>7}"
+            )
+
+    def get_user(self, username):
+        users = User.objects.all()
+        user = users.filter(username=username).first() if username else users.filter(role='OWNER').first()
+        if not user:
+            raise CommandError('No user to authenticate as (pass --user).')
+        return user
+
+    def create_session(self, user):
+        # Log the benchmark in without going through the login form
+        store = import_module(settings.SESSION_ENGINE).SessionStore()
+        store[SESSION_KEY] = str(user.pk)
+        store[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+        store[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        store.save()
+        return store.session_key
+
+    def run(self, url, cookie, concurrency, total):
+        def fetch(_):
+            request = urllib.request.Request(url, headers={'Cookie': cookie})
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    response.read()
+                    ok = response.status == 200
+            except (urllib.error.URLError, OSError):
+                ok = False
+            return time.perf_counter() - started, ok
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(fetch, range(total)))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(r[0] * 1000 for r in results)
+        return {
+            'url': url,
+            'requests': total,
+            'concurrency': concurrency,
+            'rps': total / elapsed,
+            'p50_ms': statistics.median(latencies),
+            'p95_ms': latencies[int(len(latencies) * 0.95) - 1],
+            'errors': sum(1 for r in results if not r[1]),
+        }
+
+    def bench_checkout(self, options):
+        seller = self.get_user(options['user'])
+        tills, per_till = options['tills'], options['per_till']
+        attempts = tills * per_till
+        stock = options['stock'] if options['stock'] is not None else attempts // 2
+
+        investor = User.objects.filter(role='INVESTOR').first() or seller
+        product = Product.objects.create(
+            investor=investor, name='Checkout benchmark item', quantity=stock,
+            buying_price=1, selling_price=2
+        )
+
+        def till(results):
+            sold = rejected = retries = 0
+            try:
+                for _ in range(per_till):
+                    while True:
+                        try:
+                            checkout([{'product_id': product.pk, 'quantity': 1}], seller=seller)
+                            sold += 1
+                        except OutOfStockError:
+                            rejected += 1
+                        except OperationalError:
+                            # Lock timeouts (SQLite: "database is locked"), the till retries
+                            retries += 1
+                            time.sleep(0.001)
+                            continue
+                        break
+            finally:
+                results.append((sold, rejected, retries))
+                connection.close()
+
+        results = []
+        threads = [threading.Thread(target=till, args=(results,)) for _ in range(tills)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        sold, rejected, retries = (sum(r[i] for r in results) for i in range(3))
+        product.refresh_from_db()
+        recorded = Sale.objects.filter(product=product).aggregate(q=Sum('quantity'))['q'] or 0
+        report = {
+            'tills': tills,
+            'checkouts': attempts,
+            'seconds': elapsed,
+            'checkouts_per_s': attempts / elapsed,
+            'sold': sold,
+            'rejected': rejected,
+            'retries': retries,
+            'stock_left': product.quantity,
+        }
+
+        # Scratch data out again (signals take it back out of the balances / rollups)
+        Sale.objects.filter(product=product).delete()
+        product.delete()
+
+        if sold != min(stock, attempts) or recorded != sold or product.quantity != stock - sold:
+            raise CommandError(f'Oversell / lost update: {report} (sales recorded {recorded})')
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"{tills} tills, {attempts} checkouts in {elapsed:.2f}s ({report['checkouts_per_s']:.0f} checkouts/s): "
+            f"{sold} sold, {rejected} rejected, {retries} lock retries, no oversell"
+        ))
@@ -0,0 +1,212 @@
+import json
+import statistics
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from store import urls
+from store.management.commands.query_timing_report import percentile
+from store.models import User, Product, Customer, Sale, ProductChangeRequest, ExportJob
+
+# Never benchmarked: would end the benchmark's own session
+SKIP = {'logout': 'ends the session'}
+
+class Command(BaseCommand):
+    help = (
+        'Times every URL in store/urls.py in-process (p50/p95 latency + query count) and writes a JSON '
+        'report to diff between releases. Each request runs in a rolled-back transaction, so writes '
+        '(checkout, approvals, payouts) are measured without changing the data. Seed with seed_benchmark_data first.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Username to run as (default: first OWNER)')
+        parser.add_argument('--iterations', type=int, default=20, help='Timed requests per URL')
+        parser.add_argument('--warmup', type=int, default=2, help='Untimed requests per URL first')
+        parser.add_argument('--only', action='append', help='URL name to run (repeatable, default: all)')
+        parser.add_argument('--label', default='', help='Free text stored in the report (e.g. the release)')
+        parser.add_argument('--output', help='Write the JSON report to this file')
+        parser.add_argument('--compare', help='Previous JSON report to diff against')
+        parser.add_argument('--threshold', type=float, default=20.0, help='p95 slowdown (%%) flagged as a regression')
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        user = users.filter(username=options['user']).first() if options['user'] else users.filter(role='OWNER').first()
+        if not user:
+            raise CommandError('No user to run as (pass --user).')
+
+        client = Client(raise_request_exception=False, HTTP_HOST=self.host())
+        client.force_login(user)
+        samples = self.sample_objects()
+
+        report = {
+            'label': options['label'],
+            'generated_at': timezone.now().isoformat(timespec='seconds'),
+            'database': connection.vendor,
+            'user': user.username,
+            'iterations': options['iterations'],
+            'dataset': {
+                'products': Product.objects.count(),
+                'customers': Customer.objects.count(),
+                'sales': Sale.objects.count(),
+                'investors': User.objects.filter(role='INVESTOR').count(),
+            },
+            'endpoints': {},
+            'skipped': {},
+        }
+
+        for pattern in urls.urlpatterns:
+            name = pattern.name
+            if options['only'] and name not in options['only']:
+                continue
+            spec = self.request_spec(name, list(pattern.pattern.converters), samples)
+            if isinstance(spec, str):
+                report['skipped'][name] = spec
+                continue
+            report['endpoints'][name] = self.measure(client, spec, options['warmup'], options['iterations'])
+
+        self.print_report(report)
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(report, indent=2, sort_keys=True) + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+
+        if options['compare']:
+            try:
+                previous = json.loads(Path(options['compare']).read_text())
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read {options['compare']}: {e}")
+            self.print_comparison(previous, report, options['threshold'])
+
+    # ==========================================
+    # REQUESTS
+    # ==========================================
+    def host(self):
+        # The test client's default 'testserver' host is only allowed under the test runner
+        hosts = [h for h in settings.ALLOWED_HOSTS if h != '*' and not h.startswith('.')]
+        return hosts[0] if hosts else 'localhost'
+
+    def sample_objects(self):
+        """Representative rows to fill URL parameters and query strings with."""
+        product = Product.objects.filter(quantity__gte=5).order_by('pk').first() or Product.objects.order_by('pk').first()
+        return {
+            'product': product,
+            'customer': Customer.objects.order_by('-visit_count', 'pk').first(),
+            'investor_id': User.objects.filter(role='INVESTOR').order_by('pk').values_list('pk', flat=True).first(),
+            'request_id': ProductChangeRequest.objects.filter(status='PENDING').order_by('pk').values_list('pk', flat=True).first(),
+            'job_id': ExportJob.objects.filter(status='DONE').order_by('-pk').values_list('pk', flat=True).first(),
+        }
+
+    def request_spec(self, name, params, samples):
+        """(method, path, data, content_type) for one URL name, or a string saying why it is skipped."""
+        if name in SKIP:
+            return SKIP[name]
+
+        product, customer = samples['product'], samples['customer']
+        values = {
+            'product_id': product and product.pk,
+            'customer_id': customer and customer.pk,
+            'investor_id': samples['investor_id'],
+            'request_id': samples['request_id'],
+            'job_id': samples['job_id'],
+        }
+        kwargs = {}
+        for param in params:
+            if values.get(param) is None:
+                return f'no sample object for <{param}>'
+            kwargs[param] = values[param]
+        path = reverse(name, kwargs=kwargs)
+
+        code = product.product_id if product else 'missing'
+        term = product.name.split()[1] if product else 'rice'
+        if name in ('sell_product', 'sell_product_async'):
+            if not product:
+                return 'no product to sell'
+            cart = {
+                'items': [{'product_id': product.pk, 'quantity': 1}],
+                'customer': {'name': customer.name, 'contact': customer.mobile} if customer else {},
+                'payment_method': 'CASH',
+            }
+            return ('post', path, json.dumps(cart), 'application/json')
+
+        query = {
+            'api_product_lookup': {'q': code},
+            'api_product_lookup_async': {'q': code},
+            'api_product_lookup_batch': {'q': [code]},
+            'api_search': {'q': term},
+            'api_customer_lookup': {'q': customer.mobile[:5] if customer else '017'},
+            'inventory_list': {'search': term},
+        }.get(name, {})
+        return ('get', path, query, None)
+
+    def measure(self, client, spec, warmup, iterations):
+        method, path, data, content_type = spec
+        send = getattr(client, method)
+        kwargs = {'content_type': content_type} if content_type else {}
+
+        timings, queries, status = [], [], None
+        for i in range(warmup + iterations):
+            # Roll every request back so writes don't change the data being measured
+            with transaction.atomic(), CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                response = send(path, data, **kwargs)
+                elapsed = (time.perf_counter() - started) * 1000
+                transaction.set_rollback(True)
+            if i >= warmup:
+                timings.append(elapsed)
+                queries.append(len(ctx.captured_queries))
+                status = response.status_code
+
+        return {
+            'method': method.upper(),
+            'path': path,
+            'status': status,
+            'queries': max(queries),
+            'p50_ms': round(statistics.median(timings), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'mean_ms': round(statistics.fmean(timings), 2),
+        }
+
+    # ==========================================
+    # OUTPUT
+    # ==========================================
+    def print_report(self, report):
+        dataset = ', '.join(f'{v} {k}' for k, v in report['dataset'].items())
+        self.stdout.write(f"{report['database']} | {dataset} | {report['iterations']} iteration(s) per URL")
+        self.stdout.write(f"{'URL name':<28} {'method':<6} {'status':>6} {'queries':>7} {'p50 ms':>8} {'p95 ms':>8}")
+        for name, row in report['endpoints'].items():
+            style = self.style.ERROR if row['status'] >= 400 else (lambda s: s)
+            self.stdout.write(style(
+                f"{name:<28} {row['method']:<6} {row['status']:>6} {row['queries']:>7} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f}"
+            ))
+        for name, reason in report['skipped'].items():
+            self.stdout.write(f'{name:<28} skipped: {reason}')
+
+    def print_comparison(self, previous, current, threshold):
+        self.stdout.write(f"\nCompared with {previous.get('label') or previous.get('generated_at')}:")
+        regressions = 0
+        for name, row in current['endpoints'].items():
+            old = previous.get('endpoints', {}).get(name)
+            if not old:
+                self.stdout.write(f'{name:<28} new endpoint')
+                continue
+
+            change = (row['p95_ms'] - old['p95_ms']) / old['p95_ms'] * 100 if old['p95_ms'] else 0
+            more_queries = row['queries'] > old['queries']
+            line = (
+                f"{name:<28} p95 {old['p95_ms']:>8.1f} -> {row['p95_ms']:>8.1f} ms ({change:+6.1f}%)  "
+                f"queries {old['queries']:>3} -> {row['queries']:>3}"
+            )
+            if change > threshold or more_queries:
+                regressions += 1
+                self.stdout.write(self.style.WARNING(line))
+            else:
+                self.stdout.write(line)
+
+        style = self.style.WARNING if regressions else self.style.SUCCESS
+        self.stdout.write(style(f'{regressions} endpoint(s) regressed (p95 > +{threshold:g}% or more queries).'))
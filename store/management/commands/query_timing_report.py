@@ -0,0 +1,76 @@
+import json
+import math
+from collections import defaultdict
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    # Nearest-rank percentile
+    return ordered[max(0, math.ceil(len(ordered) * pct / 100) - 1)]
+
+class Command(BaseCommand):
+    help = 'Summarizes the QUERY_TIMING log: slowest endpoints and worst repeated-query (N+1) offenders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', help='Log file to read (default: settings.QUERY_TIMING_LOG and its rotations)')
+        parser.add_argument('--top', type=int, default=10, help='Rows per table')
+
+    def handle(self, *args, **options):
+        base = Path(options['log'] or settings.QUERY_TIMING_LOG)
+        files = [base] + sorted(base.parent.glob(base.name + '.*'))
+        files = [f for f in files if f.exists()]
+        if not files:
+            raise CommandError(f'No log found at {base} (is QUERY_TIMING=1 set on the server?)')
+
+        # 1. Group requests by route
+        routes = defaultdict(list)
+        for path in files:
+            with open(path) as fh:
+                for line in fh:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    routes[entry.get('view') or entry['path']].append(entry)
+
+        rows = []
+        for view, entries in routes.items():
+            worst = max(entries, key=lambda e: e['max_repeats'])
+            rows.append({
+                'view': view,
+                'hits': len(entries),
+                'p50': percentile([e['total_ms'] for e in entries], 50),
+                'p95': percentile([e['total_ms'] for e in entries], 95),
+                'sql_p95': percentile([e['sql_ms'] for e in entries], 95),
+                'queries': sum(e['queries'] for e in entries) / len(entries),
+                'max_queries': max(e['queries'] for e in entries),
+                'max_repeats': worst['max_repeats'],
+                'repeated_sql': worst['repeated_sql'],
+                'duplicates': max(e['duplicates'] for e in entries),
+            })
+        total = sum(r['hits'] for r in rows)
+        self.stdout.write(f'{total} request(s) across {len(rows)} endpoint(s) from {len(files)} file(s)\n')
+
+        # 2. Slowest endpoints
+        self.stdout.write(self.style.MIGRATE_HEADING('Slowest endpoints (by p95)'))
+        self.stdout.write(f"{'view':40} {'hits':>6} {'p50 ms':>9} {'p95 ms':>9} {'sql p95':>9} {'avg q':>7} {'max q':>6}")
+        for r in sorted(rows, key=lambda r: -r['p95'])[:options['top']]:
+            self.stdout.write(
+                f"{r['view'][:40]:40} {r['hits']:>6} {r['p50']:>9.1f} {r['p95']:>9.1f} "
+                f"{r['sql_p95']:>9.1f} {r['queries']:>7.1f} {r['max_queries']:>6}"
+            )
+
+        # 3. N+1 offenders: the same statement shape run many times in one request
+        offenders = [r for r in rows if r['max_repeats'] > 1]
+        self.stdout.write('')
+        self.stdout.write(self.style.MIGRATE_HEADING('Repeated queries per request (N+1 suspects)'))
+        if not offenders:
+            self.stdout.write(self.style.SUCCESS('No statement ran more than once in a request.'))
+        for r in sorted(offenders, key=lambda r: -r['max_repeats'])[:options['top']]:
+            self.stdout.write(
+                self.style.WARNING(f"{r['view']}: {r['max_repeats']}x one statement, "
+                                   f"{r['duplicates']} exact duplicate(s)")
+            )
+            self.stdout.write(f"    {r['repeated_sql']}")
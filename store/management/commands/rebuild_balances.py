@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from decimal import Decimal
+from store.models import InvestorBalance
+
+class Command(BaseCommand):
+    help = 'Rebuilds (or with --check, reconciles) investor balances from the raw Sale / Payout ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Only report drift, do not write anything')
+
+    def handle(self, *args, **options):
+        cent = Decimal('0.01')
+        now = timezone.now()
+
+        with transaction.atomic():
+            ledger = InvestorBalance.from_ledger()
+            balances = {b.investor_id: b for b in InvestorBalance.objects.select_for_update()}
+
+            to_create, to_update, drift = [], [], 0
+            for investor_id in set(ledger) | set(balances):
+                earned, paid = ledger.get(investor_id, (Decimal(0), Decimal(0)))
+                earned, paid = earned.quantize(cent), paid.quantize(cent)
+                balance = balances.get(investor_id)
+
+                if balance is None:
+                    balance = InvestorBalance(investor_id=investor_id)
+                    to_create.append(balance)
+                elif (balance.earned, balance.paid, balance.due) == (earned, paid, earned - paid):
+                    continue
+                else:
+                    to_update.append(balance)
+
+                drift += 1
+                self.stdout.write(
+                    f'Investor #{investor_id}: stored earned={balance.earned} paid={balance.paid} '
+                    f'-> ledger earned={earned} paid={paid}'
+                )
+                balance.earned, balance.paid, balance.due = earned, paid, earned - paid
+                balance.updated_at = now
+
+            if options['check']:
+                style = self.style.WARNING if drift else self.style.SUCCESS
+                self.stdout.write(style(f'{drift} balance(s) out of sync with the ledger.'))
+                return
+
+            InvestorBalance.objects.bulk_create(to_create)
+            InvestorBalance.objects.bulk_update(to_update, ['earned', 'paid', 'due', 'updated_at'])
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {drift} investor balance(s) from the ledger.'))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from decimal import Decimal
+from store.models import Customer
+
+class Command(BaseCommand):
+    help = 'Rebuilds (or with --check, reconciles) customer lifetime stats from the raw Sale ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Only report drift, do not write anything')
+
+    def handle(self, *args, **options):
+        cent = Decimal('0.01')
+
+        with transaction.atomic():
+            ledger = Customer.from_ledger()
+            to_update = []
+            for customer in Customer.objects.select_for_update().only('id', 'name', 'total_spent', 'visit_count', 'last_visit'):
+                spent, visits, last = ledger.get(customer.id, (Decimal(0), 0, None))
+                spent = spent.quantize(cent)
+                if (customer.total_spent, customer.visit_count, customer.last_visit) == (spent, visits, last):
+                    continue
+
+                self.stdout.write(
+                    f'Customer #{customer.id} {customer.name}: stored spent={customer.total_spent} '
+                    f'visits={customer.visit_count} -> ledger spent={spent} visits={visits}'
+                )
+                customer.total_spent, customer.visit_count, customer.last_visit = spent, visits, last
+                to_update.append(customer)
+
+            if options['check']:
+                style = self.style.WARNING if to_update else self.style.SUCCESS
+                self.stdout.write(style(f'{len(to_update)} customer(s) out of sync with the ledger.'))
+                return
+
+            Customer.objects.bulk_update(to_update, ['total_spent', 'visit_count', 'last_visit'], batch_size=1000)
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt stats for {len(to_update)} customer(s) from the ledger.'))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from datetime import date
+from store.models import SalesDailyRollup
+
+class Command(BaseCommand):
+    help = 'Backfills the daily sales rollup table from the raw Sale ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Only rebuild days from this local date onwards (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError(f"Invalid --since date: {options['since']}")
+
+        with transaction.atomic():
+            rows = SalesDailyRollup.from_ledger(since=since)
+            stale = SalesDailyRollup.objects.all()
+            if since:
+                stale = stale.filter(day__gte=since)
+            deleted, _ = stale.delete()
+            SalesDailyRollup.objects.bulk_create(rows, batch_size=1000)
+
+        self.stdout.write(self.style.SUCCESS(f'Replaced {deleted} rollup row(s) with {len(rows)} from the ledger.'))
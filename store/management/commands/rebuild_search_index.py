@@ -0,0 +1,19 @@
+import time
+from django.core.management.base import BaseCommand
+from store.search import rebuild_index
+
+class Command(BaseCommand):
+    help = 'Rebuilds the trigram search index for products and customers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=['products', 'customers', 'all'], default='all')
+
+    def handle(self, *args, **options):
+        kinds = {'products': ['P'], 'customers': ['C'], 'all': ['P', 'C']}[options['kind']]
+        labels = {'P': 'product', 'C': 'customer'}
+
+        for kind in kinds:
+            started = time.perf_counter()
+            count = rebuild_index(kind)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(f'Indexed {count} {labels[kind]}(s) in {elapsed:.1f}s.'))
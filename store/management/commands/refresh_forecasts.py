@@ -0,0 +1,18 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from store.forecasting import refresh_forecasts, HISTORY_DAYS, WARMUP_DAYS
+
+class Command(BaseCommand):
+    help = 'Recomputes the demand forecast of every product from the daily sales rollup (run nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--history-days', type=int, default=HISTORY_DAYS, help='Days of sales history to fit on')
+
+    def handle(self, *args, **options):
+        if options['history_days'] <= WARMUP_DAYS:
+            raise CommandError(f'--history-days must be more than {WARMUP_DAYS}.')
+
+        started = time.perf_counter()
+        count = refresh_forecasts(options['history_days'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Forecast {count} product(s) in {elapsed:.1f}s.'))
@@ -0,0 +1,19 @@
+import time
+from django.core.management.base import BaseCommand
+from store.restock import refresh_restock
+
+class Command(BaseCommand):
+    help = (
+        'Recomputes restock recommendations (sales velocity, days of cover, reorder quantity). '
+        'Run it every few minutes for products whose stock changed, and nightly with --full'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Recompute every product, not only the changed ones')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = refresh_restock(full=options['full'])
+        elapsed = time.perf_counter() - started
+        scope = 'all' if options['full'] else 'changed'
+        self.stdout.write(self.style.SUCCESS(f'Recomputed {count} {scope} product(s) in {elapsed:.1f}s.'))
@@ -0,0 +1,56 @@
+import os
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from store.models import ExportJob
+from store.exports import claim_next_job, run_export_job, reclaim_stale_jobs, export_root, export_job_timeout
+
+class Command(BaseCommand):
+    help = 'Builds queued CSV export jobs into files under EXPORT_ROOT (run alongside the web workers)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the queue and exit instead of polling')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds to wait between polls when idle')
+        parser.add_argument('--purge-days', type=int, default=7, help='Delete finished jobs and their files after this many days')
+
+    def handle(self, *args, **options):
+        while True:
+            # 1. Fail jobs whose worker died mid-export, then build everything that is queued
+            reclaimed = reclaim_stale_jobs()
+            if reclaimed:
+                self.stdout.write(self.style.WARNING(f'Failed {reclaimed} job(s) abandoned by a dead worker.'))
+            while True:
+                job = claim_next_job()
+                if job is None:
+                    break
+                job = run_export_job(job)
+                if job.status == 'DONE':
+                    self.stdout.write(self.style.SUCCESS(f'{job}: {job.row_count} row(s) -> {job.file_path}'))
+                else:
+                    self.stdout.write(self.style.ERROR(f'{job}: {job.error}'))
+
+            # 2. Clear out old reports and partial files nobody is writing any more
+            self.purge(options['purge_days'])
+            self.purge_partials()
+
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
+
+    def purge(self, days):
+        cutoff = timezone.now() - timedelta(days=days)
+        old_jobs = ExportJob.objects.filter(status__in=['DONE', 'FAILED'], finished_at__lt=cutoff)
+        for path in old_jobs.exclude(file_path='').values_list('file_path', flat=True):
+            if os.path.exists(path):
+                os.remove(path)
+        old_jobs.delete()
+
+    def purge_partials(self):
+        cutoff = time.time() - export_job_timeout()
+        root = export_root()
+        if not root.is_dir():
+            return
+        for path in root.glob('*.part'):
+            if path.stat().st_mtime < cutoff:
+                path.unlink(missing_ok=True)
@@ -0,0 +1,249 @@
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from store.models import User, Product, Customer, Sale, Payout, ProductChangeRequest
+
+FIRST_NAMES = [
+    'Rahim', 'Karim', 'Nasrin', 'Farhana', 'Tanvir', 'Sabbir', 'Mitu', 'Jamal', 'Rupa', 'Habib',
+    'Sumon', 'Lipi', 'Arif', 'Shila', 'Babul', 'Ratna', 'Kamal', 'Moni', 'Zahid', 'Dipa',
+]
+LAST_NAMES = ['Ahmed', 'Hossain', 'Islam', 'Rahman', 'Khan', 'Chowdhury', 'Sarker', 'Uddin', 'Begum', 'Akter']
+ADJECTIVES = ['Classic', 'Premium', 'Organic', 'Deluxe', 'Mini', 'Family', 'Eco', 'Smart', 'Golden', 'Fresh']
+NOUNS = [
+    'Rice', 'Lentils', 'Tea', 'Soap', 'Shampoo', 'Lamp', 'Kettle', 'Notebook', 'Pen Set', 'Towel',
+    'Mug', 'Biscuits', 'Honey', 'Ghee', 'Sandals', 'Umbrella', 'Charger', 'Headphones', 'Backpack', 'Fan',
+]
+SIZES = ['100g', '250g', '500g', '1kg', '2kg', 'S', 'M', 'L', 'XL', 'Pack of 6']
+
+MAX_PRODUCTS_PER_PREFIX = 3000  # product_id = 3 letters + 4 digits, keep the space sparse
+
+@contextmanager
+def historical_timestamps(*fields):
+    """Lets bulk_create keep the generated dates instead of auto_now/auto_now_add."""
+    saved = [(f, f.auto_now, f.auto_now_add) for f in fields]
+    for f, _, _ in saved:
+        f.auto_now = f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, auto_now, auto_now_add in saved:
+            f.auto_now, f.auto_now_add = auto_now, auto_now_add
+
+def with_pks(model, objs):
+    """bulk_create only fills pks on backends that return rows (SQLite, Postgres); read them back otherwise."""
+    if objs and objs[0].pk is None:
+        pks = model.objects.order_by('-pk').values_list('pk', flat=True)[:len(objs)]
+        for obj, pk in zip(objs, reversed(list(pks))):
+            obj.pk = pk
+    return objs
+
+class Command(BaseCommand):
+    help = (
+        'Generates realistic investors, products, customers, multi-line transactions and payouts '
+        'in bulk for benchmarking (e.g. --sales 1000000), then rebuilds the derived tables'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--investors', type=int, default=10)
+        parser.add_argument('--products', type=int, default=2000)
+        parser.add_argument('--customers', type=int, default=20000)
+        parser.add_argument('--sales', type=int, default=100000, help='Sale lines (a receipt has 1-5 lines)')
+        parser.add_argument('--change-requests', type=int, default=50, help='Pending investor change requests')
+        parser.add_argument('--days', type=int, default=365, help='Spread sales over this many past days')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (same seed = same data)')
+        parser.add_argument('--password', default='bench1234', help='Password for every generated user')
+
+    def handle(self, *args, **options):
+        if User.objects.filter(username='bench_owner').exists():
+            raise CommandError('Benchmark data is already seeded (user bench_owner exists). Use a fresh database.')
+
+        prefixes = min(options['investors'], len(FIRST_NAMES))
+        if options['investors'] < 1 or options['products'] > prefixes * MAX_PRODUCTS_PER_PREFIX:
+            raise CommandError(
+                f'Too many products for {options["investors"]} investor(s): '
+                f'at most {MAX_PRODUCTS_PER_PREFIX} per investor name prefix. Add --investors.'
+            )
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.start = self.now - timedelta(days=options['days'])
+
+        # 1. People
+        staff, investors = self.step('users', lambda: self.create_users(options['investors'], options['password']))
+        customer_ids = self.step('customers', lambda: self.create_customers(options['customers']))
+        products = self.step('products', lambda: self.create_products(investors, options['products']))
+
+        # 2. Ledger
+        self.step('sales', lambda: self.create_sales(products, customer_ids, staff, options['sales']))
+        self.step('payouts', lambda: self.create_payouts(investors))
+        self.step('change requests', lambda: self.create_change_requests(products, options['change_requests']))
+
+        # 3. Derived tables (bulk_create skips the signals / model saves that maintain them)
+        for command in ('rebuild_balances', 'rebuild_sales_rollup', 'rebuild_customer_stats', 'rebuild_search_index'):
+            self.step(command, lambda: call_command(command, stdout=StringIO()))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {len(investors)} investor(s), {len(products)} product(s), {len(customer_ids)} customer(s) '
+            f'and {options["sales"]} sale line(s). Log in as bench_owner / {options["password"]}.'
+        ))
+
+    def step(self, label, fn):
+        started = time.perf_counter()
+        result = fn()
+        self.stdout.write(f'  {label:<24} {time.perf_counter() - started:>7.1f}s')
+        return result
+
+    def random_date(self):
+        return self.start + timedelta(seconds=self.rng.randrange(int((self.now - self.start).total_seconds())))
+
+    # ==========================================
+    # GENERATORS
+    # ==========================================
+    def create_users(self, investor_count, password):
+        # Hash once, every generated account shares the same password
+        hashed = make_password(password)
+        users = [
+            User(username='bench_owner', role='OWNER', password=hashed, is_staff=True),
+            User(username='bench_staff', role='STAFF', password=hashed),
+        ]
+        for i in range(investor_count):
+            first = FIRST_NAMES[i % len(FIRST_NAMES)]
+            users.append(User(
+                username=f'{first.lower()}{i + 1}', first_name=first,
+                last_name=self.rng.choice(LAST_NAMES), role='INVESTOR', password=hashed,
+            ))
+        User.objects.bulk_create(users)
+
+        users = User.objects.filter(username__in=[u.username for u in users])
+        staff = [u.pk for u in users if u.role in ('OWNER', 'STAFF')]
+        investors = [u for u in users if u.role == 'INVESTOR']
+        return staff, investors
+
+    def create_customers(self, count):
+        taken = set(Customer.objects.values_list('mobile', flat=True))
+        mobiles = (f'01{n}' for n in self.rng.sample(range(300000000, 999999999), count + len(taken)))
+
+        customers = []
+        for mobile in mobiles:
+            if len(customers) == count:
+                break
+            if mobile in taken:
+                continue
+            first, last = self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+            customers.append(Customer(
+                name=f'{first} {last}', mobile=mobile,
+                email=f'{first.lower()}.{mobile[-4:]}@example.com' if self.rng.random() < 0.4 else None,
+                created_at=self.random_date(),
+            ))
+
+        with historical_timestamps(Customer._meta.get_field('created_at')):
+            Customer.objects.bulk_create(customers, batch_size=self.batch_size)
+        return [c.pk for c in with_pks(Customer, customers)]
+
+    def create_products(self, investors, count):
+        owners = [self.rng.choice(investors) for _ in range(count)]
+        codes = []
+        for i in range(0, count, self.batch_size):
+            codes += Product.generate_product_ids([u.username for u in owners[i:i + self.batch_size]])
+
+        products = []
+        for investor, code in zip(owners, codes):
+            cost = Decimal(self.rng.randrange(50, 50000)) / 10
+            created = self.random_date()
+            products.append(Product(
+                investor=investor, product_id=code,
+                name=f'{self.rng.choice(ADJECTIVES)} {self.rng.choice(NOUNS)} {self.rng.choice(SIZES)}',
+                quantity=self.rng.randrange(0, 200),
+                buying_price=cost,
+                selling_price=(cost * Decimal(self.rng.uniform(1.1, 1.6))).quantize(Decimal('0.01')),
+                low_stock_threshold=self.rng.choice([3, 5, 10]),
+                created_at=created, updated_at=created,
+            ))
+
+        fields = [Product._meta.get_field('created_at'), Product._meta.get_field('updated_at')]
+        with historical_timestamps(*fields):
+            Product.objects.bulk_create(products, batch_size=self.batch_size)
+        return with_pks(Product, products)
+
+    def create_sales(self, products, customer_ids, staff, count):
+        # A few products sell far more than the rest, like a real shop
+        weights = [self.rng.paretovariate(1.2) for _ in products]
+        methods, method_weights = ['CASH', 'CARD', 'ONLINE'], [6, 3, 1]
+
+        batch, created = [], 0
+        date_field = Sale._meta.get_field('date')
+        with historical_timestamps(date_field), transaction.atomic():
+            while created < count:
+                # 1. One receipt: same time, customer, seller and payment method
+                lines = min(self.rng.choice([1, 1, 1, 2, 2, 3, 4, 5]), count - created)
+                date = self.random_date()
+                customer_id = self.rng.choice(customer_ids) if customer_ids and self.rng.random() < 0.7 else None
+                receipt = dict(
+                    transaction_id=str(uuid.UUID(int=self.rng.getrandbits(128)))[:8].upper(),
+                    sold_by_id=self.rng.choice(staff), customer_id=customer_id, date=date,
+                    customer_name_text=None if customer_id else 'Walk-in',
+                    payment_method=self.rng.choices(methods, method_weights)[0],
+                    discount_percent=Decimal(self.rng.choice([0, 0, 0, 0, 5, 10])),
+                )
+
+                # 2. Lines priced exactly like a checkout would
+                for product in self.rng.choices(products, weights, k=lines):
+                    sale = Sale(product=product, quantity=self.rng.choice([1, 1, 1, 2, 3]), **receipt)
+                    sale.calculate_amounts()
+                    batch.append(sale)
+                created += lines
+
+                if len(batch) >= self.batch_size:
+                    Sale.objects.bulk_create(batch)
+                    batch = []
+            Sale.objects.bulk_create(batch)
+
+    def create_payouts(self, investors):
+        # Pay each investor out part of what they earned, in a handful of instalments
+        earned = dict(
+            Sale.objects.values('product__investor_id').annotate(t=Sum('investor_profit_amount'))
+            .values_list('product__investor_id', 't')
+        )
+
+        payouts = []
+        for investor in investors:
+            total = earned.get(investor.pk, Decimal(0)) * Decimal(self.rng.uniform(0.4, 0.8))
+            instalments = self.rng.randrange(3, 12)
+            for _ in range(instalments):
+                payouts.append(Payout(
+                    investor=investor, amount=(total / instalments).quantize(Decimal('0.01')),
+                    date=self.random_date(), notes='Seeded payout',
+                ))
+
+        with historical_timestamps(Payout._meta.get_field('date')):
+            Payout.objects.bulk_create(payouts, batch_size=self.batch_size)
+
+    def create_change_requests(self, products, count):
+        # Pending approvals queue: mostly restock / price edits, some new listings
+        change_requests = []
+        for product in self.rng.sample(products, min(count, len(products))):
+            edit = self.rng.random() < 0.7
+            change_requests.append(ProductChangeRequest(
+                requester=product.investor,
+                request_type='EDIT' if edit else 'NEW',
+                target_product=product if edit else None,
+                name=product.name if edit else f'{product.name} (New)',
+                quantity=product.quantity + self.rng.randrange(10, 100),
+                buying_price=product.buying_price,
+                selling_price=product.selling_price,
+                low_stock_threshold=product.low_stock_threshold,
+            ))
+        ProductChangeRequest.objects.bulk_create(change_requests, batch_size=self.batch_size)
@@ -0,0 +1,98 @@
+import json
+import logging
+import time
+from collections import Counter
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('store.query_timing')
+
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 3
+
+class QueryCollector:
+    """execute_wrapper that times every SQL statement run during one request."""
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()   # same SQL shape (N+1 signature)
+        self.exact = Counter()        # same SQL *and* params (pure duplicates)
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+            try:
+                self.exact[(sql, repr(params))] += 1
+            except Exception:
+                pass
+
+class QueryTimingMiddleware:
+    """
+    Opt-in (settings.QUERY_TIMING) per-request SQL stats: query count, SQL time,
+    repeated statements and view time, sent as a Server-Timing header and appended
+    as one JSON line to a rotating log (see `manage.py query_timing_report`).
+    """
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_TIMING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+        if not logger.handlers:
+            path = Path(settings.QUERY_TIMING_LOG)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            handler = RotatingFileHandler(path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS)
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+
+    def __call__(self, request):
+        collector = QueryCollector()
+        started = time.perf_counter()
+
+        wrappers = [connections[alias].execute_wrapper(collector) for alias in connections]
+        for wrapper in wrappers:
+            wrapper.__enter__()
+        try:
+            response = self.get_response(request)
+        finally:
+            for wrapper in reversed(wrappers):
+                wrapper.__exit__(None, None, None)
+
+        total_ms = (time.perf_counter() - started) * 1000
+        sql_ms = collector.duration * 1000
+        repeated_sql, repeated = collector.statements.most_common(1)[0] if collector.count else ('', 0)
+        duplicates = sum(n - 1 for n in collector.exact.values() if n > 1)
+
+        # 1. Header (visible in the browser's network panel)
+        response['Server-Timing'] = ', '.join([
+            f'sql;dur={sql_ms:.1f};desc="{collector.count} queries"',
+            f'view;dur={total_ms - sql_ms:.1f}',
+            f'total;dur={total_ms:.1f}',
+        ])
+
+        # 2. Rolling log, one JSON object per request
+        match = request.resolver_match
+        logger.info(json.dumps({
+            'at': time.time(),
+            'method': request.method,
+            'path': request.path,
+            'route': match.route if match else None,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'queries': collector.count,
+            'sql_ms': round(sql_ms, 2),
+            'total_ms': round(total_ms, 2),
+            'duplicates': duplicates,
+            'max_repeats': repeated,
+            'repeated_sql': repeated_sql[:300] if repeated > 1 else '',
+        }))
+        return response
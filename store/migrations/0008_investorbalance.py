@@ -0,0 +1,53 @@
+# Generated by Django 6.0 on 2026-10-16 20:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_balances(apps, schema_editor):
+    # Seed the running balances from the existing Sale / Payout ledger
+    Sale = apps.get_model('store', 'Sale')
+    Payout = apps.get_model('store', 'Payout')
+    InvestorBalance = apps.get_model('store', 'InvestorBalance')
+
+    earned = dict(
+        Sale.objects.filter(product__isnull=False).order_by().values('product__investor')
+        .annotate(t=Sum('investor_profit_amount')).values_list('product__investor', 't')
+    )
+    paid = dict(
+        Payout.objects.order_by().values('investor')
+        .annotate(t=Sum('amount')).values_list('investor', 't')
+    )
+    InvestorBalance.objects.bulk_create([
+        InvestorBalance(
+            investor_id=inv,
+            earned=earned.get(inv) or 0,
+            paid=paid.get(inv) or 0,
+            due=(earned.get(inv) or 0) - (paid.get(inv) or 0),
+        )
+        for inv in set(earned) | set(paid)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0007_remove_productchangerequest_is_approved_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InvestorBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('earned', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('paid', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('due', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('investor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='balance', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(backfill_balances, migrations.RunPython.noop),
+    ]
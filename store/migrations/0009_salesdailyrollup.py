@@ -0,0 +1,67 @@
+# Generated by Django 6.0 on 2026-10-16 20:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_rollup(apps, schema_editor):
+    # Fold the existing Sale ledger into day x product x investor x method rows
+    Sale = apps.get_model('store', 'Sale')
+    SalesDailyRollup = apps.get_model('store', 'SalesDailyRollup')
+
+    grouped = Sale.objects.annotate(day=TruncDate('date')).order_by().values(
+        'day', 'product', 'product__investor', 'payment_method'
+    ).annotate(
+        sale_count=Count('id'),
+        qty=Sum('quantity'),
+        revenue=Sum('total_amount'),
+        owner_profit=Sum('owner_profit_amount'),
+        investor_profit=Sum('investor_profit_amount')
+    )
+    SalesDailyRollup.objects.bulk_create([
+        SalesDailyRollup(
+            day=row['day'],
+            product_id=row['product'],
+            investor_id=row['product__investor'],
+            payment_method=row['payment_method'],
+            sale_count=row['sale_count'],
+            quantity=row['qty'],
+            revenue=row['revenue'],
+            owner_profit=row['owner_profit'],
+            investor_profit=row['investor_profit'],
+        )
+        for row in grouped
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0008_investorbalance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('payment_method', models.CharField(choices=[('CASH', 'Cash'), ('CARD', 'Card'), ('ONLINE', 'Online Transfer')], max_length=10)),
+                ('sale_count', models.IntegerField(default=0)),
+                ('quantity', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('owner_profit', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('investor_profit', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('investor', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='daily_rollups', to=settings.AUTH_USER_MODEL)),
+                ('product', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='daily_rollups', to='store.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['investor', 'day'], name='store_sales_investo_99e069_idx')],
+                'constraints': [models.UniqueConstraint(fields=('day', 'product', 'investor', 'payment_method'), name='unique_sales_rollup_key')],
+            },
+        ),
+        migrations.RunPython(backfill_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 6.0 on 2026-10-16 22:45
+
+from django.db import migrations, models
+
+
+def gram_set(values):
+    found = set()
+    for value in values:
+        text = ' '.join(str(value or '').lower().split())
+        found |= {text[i:i + 3] for i in range(len(text) - 2)}
+    return found
+
+
+def backfill_search_index(apps, schema_editor):
+    # Index the existing products and customers (same trigrams as store.search)
+    SearchGram = apps.get_model('store', 'SearchGram')
+    sources = [
+        ('P', apps.get_model('store', 'Product'), ('name', 'product_id')),
+        ('C', apps.get_model('store', 'Customer'), ('name', 'mobile', 'email')),
+    ]
+    for kind, model, fields in sources:
+        batch = []
+        for pk, *values in model.objects.values_list('pk', *fields).iterator(chunk_size=5000):
+            batch.extend(SearchGram(kind=kind, object_id=pk, gram=gram) for gram in gram_set(values))
+            if len(batch) >= 5000:
+                SearchGram.objects.bulk_create(batch)
+                batch = []
+        SearchGram.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0013_product_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchGram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('P', 'Product'), ('C', 'Customer')], max_length=1)),
+                ('object_id', models.IntegerField()),
+                ('gram', models.CharField(max_length=3)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'gram', 'object_id'], name='search_gram_lookup_idx')],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id', 'gram'), name='unique_search_gram')],
+            },
+        ),
+        migrations.RunPython(backfill_search_index, migrations.RunPython.noop),
+    ]
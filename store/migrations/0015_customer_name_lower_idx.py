@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-16 23:20
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0014_searchgram'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='customer_name_lower_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 6.0 on 2026-10-16 23:55
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+
+
+def backfill_customer_stats(apps, schema_editor):
+    # Fold each customer's existing sales into the new lifetime columns
+    Sale = apps.get_model('store', 'Sale')
+    Customer = apps.get_model('store', 'Customer')
+
+    grouped = Sale.objects.filter(customer__isnull=False).order_by().values('customer').annotate(
+        spent=Sum('total_amount'), visits=Count('id'), last=Max('date')
+    )
+    customers = []
+    for row in grouped:
+        customers.append(Customer(id=row['customer'], total_spent=row['spent'], visit_count=row['visits'], last_visit=row['last']))
+    Customer.objects.bulk_update(customers, ['total_spent', 'visit_count', 'last_visit'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0015_customer_name_lower_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='last_visit',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='total_spent',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='visit_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['total_spent', 'id'], name='customer_spent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['visit_count', 'id'], name='customer_visits_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['last_visit', 'id'], name='customer_last_visit_idx'),
+        ),
+        migrations.RunPython(backfill_customer_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.0 on 2026-10-17 00:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0016_customer_lifetime_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('daily_rate', models.FloatField(help_text='Smoothed units sold per day')),
+                ('trend', models.FloatField(help_text='Change in daily units per day (damped)')),
+                ('next_7_days', models.FloatField()),
+                ('next_30_days', models.FloatField()),
+                ('alpha', models.FloatField(help_text='Smoothing factor picked for this product')),
+                ('error', models.FloatField(help_text='One-step-ahead RMSE over the history window')),
+                ('generated_at', models.DateTimeField()),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='forecast', to='store.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-next_7_days'], name='forecast_next_7_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 6.0 on 2026-10-17 01:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0017_product_forecast'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exportjob',
+            name='kind',
+            field=models.CharField(choices=[('SALES', 'Sales Report'), ('INVENTORY', 'Inventory Report'), ('RESTOCK', 'Restock Report')], max_length=10),
+        ),
+        migrations.CreateModel(
+            name='RestockRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('OUT', 'Out of Stock'), ('REORDER', 'Reorder Now'), ('OK', 'Covered'), ('IDLE', 'No Recent Sales')], max_length=10)),
+                ('velocity', models.FloatField(help_text='Units sold per day (recent days weigh more)')),
+                ('stock', models.IntegerField(help_text='Quantity on hand when computed')),
+                ('days_of_cover', models.FloatField(blank=True, help_text='Days until the stock runs out (empty = not selling)', null=True)),
+                ('reorder_point', models.IntegerField(default=0)),
+                ('reorder_qty', models.IntegerField(default=0)),
+                ('computed_at', models.DateTimeField()),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='restock', to='store.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'days_of_cover'], name='restock_status_cover_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.0 on 2026-10-17 02:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_sale_investor(apps, schema_editor):
+    # Credit existing sales to their product's current investor (orphaned sales stay NULL)
+    Sale = apps.get_model('store', 'Sale')
+    Product = apps.get_model('store', 'Product')
+    Sale.objects.filter(product__isnull=False).update(
+        investor=Subquery(Product.objects.filter(pk=OuterRef('product_id')).values('investor_id')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0018_restock_recommendation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sale',
+            name='investor',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='credited_sales', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(backfill_sale_investor, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,11 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, Q, Sum, Count, Max, Case, When, Value, Subquery, OuterRef
+from django.db.models.functions import TruncDate, Lower
 from django.contrib.auth.models import AbstractUser
+from django.dispatch import Signal
+from django.utils import timezone
 import uuid
+from datetime import datetime, time
 from decimal import Decimal
 
 # 1. Custom User Model
@@ -17,6 +22,16 @@ class User(AbstractUser):
     
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default=IS_STAFF)
 
+class OutOfStockError(ValueError):
+    """Raised when a guarded stock decrement finds fewer units than requested."""
+    def __init__(self, shortages):
+        # shortages: list of (product name, available, requested)
+        self.shortages = shortages
+        super().__init__("; ".join(
+            f"Not enough stock for {name} (only {available} left, {requested} requested)"
+            for name, available, requested in shortages
+        ))
+
 # 2. Product Model
 class Product(models.Model):
     investor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='products')
@@ -43,17 +58,76 @@ class Product(models.Model):
     
     low_stock_threshold = models.IntegerField(default=5)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Bumped on every change (including queryset stock updates) for POS catalog deltas
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Newest-first inventory pages (keyset on created_at, id)
+            models.Index(fields=['created_at', 'id'], name='product_created_id_idx'),
+            # Scan lookup fallback: case-insensitive product_id / name equality
+            models.Index(Lower('product_id'), name='product_code_lower_idx'),
+            models.Index(Lower('name'), name='product_name_lower_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.product_id:
-            prefix = self.investor.username[:3].upper()
-            suffix = str(uuid.uuid4().int)[:4]
-            self.product_id = f"{prefix}{suffix}"
+            self.product_id = Product.generate_product_ids([self.investor.username])[0]
         super().save(*args, **kwargs)
 
+    @classmethod
+    def generate_product_ids(cls, usernames):
+        """
+        One unused product_id per username (first 3 letters + 4 random digits).
+        Candidates are drawn distinct from each other and checked against the
+        table in one query per round, so a whole batch can be bulk-created
+        safely and usually costs a single query.
+        """
+        ids = [None] * len(usernames)
+        taken = set()
+        todo = list(range(len(usernames)))
+
+        for _ in range(20):
+            if not todo:
+                return ids
+            candidates = {}
+            drawn = set(taken)
+            for i in todo:
+                # Redraw in memory on a clash within the batch; only clashes
+                # with existing rows need another round trip.
+                for _ in range(20):
+                    code = f"{usernames[i][:3].upper()}{str(uuid.uuid4().int)[:4]}"
+                    if code not in drawn:
+                        break
+                drawn.add(code)
+                candidates[i] = code
+            existing = set(cls.objects.filter(
+                product_id__in=candidates.values()
+            ).values_list('product_id', flat=True))
+
+            todo = []
+            for i, code in candidates.items():
+                if code in existing or code in taken:
+                    todo.append(i)  # Collision: draw again next round
+                else:
+                    taken.add(code)
+                    ids[i] = code
+
+        if todo:
+            raise ValueError("Could not generate unique product IDs, the ID space is nearly full")
+        return ids
+
     def __str__(self):
         return f"{self.name} ({self.product_id})"
 
+# Tombstones so offline POS catalogs can drop deleted products on their next delta
+class DeletedProduct(models.Model):
+    product_pk = models.IntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"Product #{self.product_pk} deleted {self.deleted_at}"
+
 # 3. Customer Model
 class Customer(models.Model):
     name = models.CharField(max_length=100)
@@ -61,9 +135,88 @@ class Customer(models.Model):
     email = models.EmailField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Lifetime stats, maintained with every recorded sale (see Sale.record_batch_totals)
+    total_spent = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    visit_count = models.IntegerField(default=0)
+    last_visit = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # POS typeahead: name prefix as a range on LOWER(name)
+            models.Index(Lower('name'), name='customer_name_lower_idx'),
+            # customer_list sorts (keyset on value, id)
+            models.Index(fields=['total_spent', 'id'], name='customer_spent_idx'),
+            models.Index(fields=['visit_count', 'id'], name='customer_visits_idx'),
+            models.Index(fields=['last_visit', 'id'], name='customer_last_visit_idx'),
+        ]
+
+    @classmethod
+    def upsert(cls, mobile, name=None):
+        """
+        The customer for `mobile`, written only when needed: returning customers
+        with the same name cost one indexed read and no writes. A blank mobile
+        is a walk-in sale and returns None without touching the table.
+        """
+        mobile = (mobile or '').strip()
+        if not mobile:
+            return None
+
+        customer = cls.objects.filter(mobile=mobile).first()
+        if customer is None:
+            try:
+                with transaction.atomic():
+                    return cls.objects.create(mobile=mobile, name=name or "Unknown")
+            except IntegrityError:
+                # Another till added this customer first
+                customer = cls.objects.get(mobile=mobile)
+
+        if name and customer.name != name:
+            customer.name = name
+            customer.save(update_fields=['name'])
+        return customer
+
+    @classmethod
+    def record_sales(cls, sales, sign=1):
+        """Adds (sign=1) or removes (sign=-1) sales from their customers' lifetime stats."""
+        totals = {}
+        for sale in sales:
+            if sale.customer_id:
+                spent, visits, last = totals.get(sale.customer_id, (Decimal(0), 0, sale.date))
+                totals[sale.customer_id] = (spent + sale.total_amount, visits + 1, max(last, sale.date))
+
+        removed = [sale.pk for sale in sales]
+        for customer_id, (spent, visits, last) in totals.items():
+            changes = {
+                'total_spent': F('total_spent') + sign * spent,
+                'visit_count': F('visit_count') + sign * visits,
+            }
+            if sign > 0:
+                changes['last_visit'] = Case(
+                    When(Q(last_visit__isnull=True) | Q(last_visit__lt=last), then=Value(last)),
+                    default=F('last_visit')
+                )
+            else:
+                # The removed sale may have been the latest one: take the next latest
+                changes['last_visit'] = Subquery(
+                    Sale.objects.filter(customer=OuterRef('pk')).exclude(pk__in=removed)
+                    .order_by('-date').values('date')[:1]
+                )
+            cls.objects.filter(pk=customer_id).update(**changes)
+
+    @classmethod
+    def from_ledger(cls):
+        """Recomputes {customer_id: (spent, visits, last_visit)} from the raw Sale table."""
+        rows = Sale.objects.filter(customer__isnull=False).order_by().values('customer').annotate(
+            spent=Sum('total_amount'), visits=Count('id'), last=Max('date')
+        )
+        return {row['customer']: (row['spent'], row['visits'], row['last']) for row in rows}
+
     def __str__(self):
         return f"{self.name} ({self.mobile})"
 
+# Sent by Sale.record_batch_totals with the ids of the investors whose sales changed
+sales_recorded = Signal()
+
 # 4. Sale Model (Updated with Discount)
 class Sale(models.Model):
     PAYMENT_METHODS = [
@@ -76,6 +229,8 @@ class Sale(models.Model):
     transaction_id = models.CharField(max_length=50, blank=True, null=True)
 
     product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True)
+    # The product's investor when the sale was recorded: keeps the rollup key once the product is deleted
+    investor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name='credited_sales')
     sold_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     
     customer = models.ForeignKey(Customer, on_delete=models.SET_NULL, null=True, blank=True, related_name='sales')
@@ -94,36 +249,88 @@ class Sale(models.Model):
     owner_profit_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     investor_profit_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
 
+    class Meta:
+        # Matched to the real query shapes: ledger pages / date ranges ordered by (date, id),
+        # receipt lookups, payment-method totals and per-product (investor) history
+        indexes = [
+            models.Index(fields=['date', 'id'], name='sale_date_id_idx'),
+            models.Index(fields=['transaction_id'], name='sale_transaction_idx'),
+            models.Index(fields=['payment_method', 'date'], name='sale_method_date_idx'),
+            models.Index(fields=['product', 'date'], name='sale_product_date_idx'),
+        ]
+
+    def calculate_amounts(self):
+        """Prices this line from its product: discounted total + owner/investor profit split."""
+        self.investor_id = self.product.investor_id
+
+        # 1. Calculate Gross for this item
+        gross_total = self.product.selling_price * self.quantity
+        
+        # 2. Apply Percentage Discount (e.g., 10%)
+        # Formula: Price - (Price * (10/100))
+        discount_amount = gross_total * (self.discount_percent / Decimal(100))
+        self.total_amount = gross_total - discount_amount
+        
+        # 3. Calculate Net Profit based on DISCOUNTED amount
+        total_cost = self.product.buying_price * self.quantity
+        total_net_profit = self.total_amount - total_cost
+        
+        # 4. Split Profit
+        owner_percent = Decimal(self.product.owner_split_percent) / Decimal(100)
+        investor_percent = Decimal(self.product.investor_split_percent) / Decimal(100)
+        
+        self.owner_profit_amount = total_net_profit * owner_percent
+        
+        # Investor gets profit share + original capital
+        investor_share = total_net_profit * investor_percent
+        self.investor_profit_amount = investor_share + total_cost
+
     def save(self, *args, **kwargs):
         if self.product:
-            # 1. Calculate Gross for this item
-            gross_total = self.product.selling_price * self.quantity
-            
-            # 2. Apply Percentage Discount (e.g., 10%)
-            # Formula: Price - (Price * (10/100))
-            discount_amount = gross_total * (self.discount_percent / Decimal(100))
-            self.total_amount = gross_total - discount_amount
-            
-            # 3. Calculate Net Profit based on DISCOUNTED amount
-            total_cost = self.product.buying_price * self.quantity
-            total_net_profit = self.total_amount - total_cost
-            
-            # 4. Split Profit
-            owner_percent = Decimal(self.product.owner_split_percent) / Decimal(100)
-            investor_percent = Decimal(self.product.investor_split_percent) / Decimal(100)
-            
-            self.owner_profit_amount = total_net_profit * owner_percent
-            
-            # Investor gets profit share + original capital
-            investor_share = total_net_profit * investor_percent
-            self.investor_profit_amount = investor_share + total_cost
-            
-            # Reduce Stock (Only on new sale)
-            if not self.pk: 
+            self.calculate_amounts()
+
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = Sale.objects.select_related('product').filter(pk=self.pk).first()
+
+            # Reduce Stock (Only on new sale) with a guarded, database-side decrement
+            if self.product and not self.pk:
+                reserved = Product.objects.filter(pk=self.product.pk, quantity__gte=self.quantity).update(
+                    quantity=F('quantity') - self.quantity, updated_at=timezone.now()
+                )
+                if not reserved:
+                    available = Product.objects.filter(pk=self.product.pk).values_list('quantity', flat=True).first()
+                    raise OutOfStockError([(self.product.name, available or 0, self.quantity)])
                 self.product.quantity -= self.quantity
-                self.product.save()
-            
-        super().save(*args, **kwargs)
+
+            super().save(*args, **kwargs)
+
+            # Keep the running balances & daily rollups in step with the ledger
+            if previous:
+                previous.record_totals(sign=-1)
+            self.record_totals()
+
+    # Deleted sales (one at a time or by queryset) are taken out of the totals in signals.py
+
+    def record_totals(self, sign=1):
+        """Adds (sign=1) or removes (sign=-1) this sale from the denormalized totals."""
+        Sale.record_batch_totals([self], sign=sign)
+
+    @staticmethod
+    def record_batch_totals(sales, sign=1):
+        """Batched record_totals(): one balance update per investor, one rollup update per bucket."""
+        earned = {}
+        for sale in sales:
+            if sale.product:
+                investor_id = sale.product.investor_id
+                earned[investor_id] = earned.get(investor_id, Decimal(0)) + sale.investor_profit_amount
+
+        for investor_id, amount in earned.items():
+            InvestorBalance.apply(investor_id, earned=sign * amount)
+        SalesDailyRollup.record(sales, sign=sign)
+        Customer.record_sales(sales, sign=sign)
+        sales_recorded.send(sender=Sale, investor_ids=set(earned))
         
 # 5. Payout History
 class Payout(models.Model):
@@ -133,13 +340,175 @@ class Payout(models.Model):
     proof_image = models.ImageField(upload_to='payout_proofs/', blank=True, null=True)
     notes = models.TextField(blank=True)
 
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = Payout.objects.filter(pk=self.pk).values('investor_id', 'amount').first()
+            super().save(*args, **kwargs)
+
+            # Apply the old -> new difference so edits keep `paid` in step
+            paid = Decimal(str(self.amount))
+            if previous and previous['investor_id'] != self.investor_id:
+                InvestorBalance.apply(previous['investor_id'], paid=-previous['amount'])
+            elif previous:
+                paid -= previous['amount']
+            if paid:
+                InvestorBalance.apply(self.investor_id, paid=paid)
+
+    # Deleted payouts are taken out of `paid` in signals.py (covers queryset deletes too)
+
     def __str__(self):
         return f"Paid {self.amount} to {self.investor.username}"
+
+# 6. Investor Balance (Denormalized running totals of the Sale / Payout ledger)
+class InvestorBalance(models.Model):
+    investor = models.OneToOneField(User, on_delete=models.CASCADE, related_name='balance')
+    earned = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    paid = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    due = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def apply(cls, investor_id, earned=0, paid=0):
+        """Adds earned/paid deltas to an investor's balance (call inside the ledger transaction)."""
+        updated = cls.objects.filter(investor_id=investor_id).update(
+            earned=F('earned') + earned,
+            paid=F('paid') + paid,
+            due=F('due') + earned - paid,
+            updated_at=timezone.now()
+        )
+        if updated:
+            return
+        try:
+            # First ledger entry for this investor
+            with transaction.atomic():
+                cls.objects.create(investor_id=investor_id, earned=earned, paid=paid, due=earned - paid)
+        except IntegrityError:
+            # Another till created the row first, fall back to the increment
+            cls.apply(investor_id, earned=earned, paid=paid)
+
+    @classmethod
+    def from_ledger(cls):
+        """
+        Recomputes {investor_id: (earned, paid)} from the raw Sale and Payout tables.
+        Sales whose product was deleted count for nobody, matching the running balance.
+        """
+        earned = dict(
+            Sale.objects.filter(product__isnull=False).order_by().values('product__investor')
+            .annotate(t=Sum('investor_profit_amount')).values_list('product__investor', 't')
+        )
+        paid = dict(
+            Payout.objects.order_by().values('investor')
+            .annotate(t=Sum('amount')).values_list('investor', 't')
+        )
+        return {
+            inv: (earned.get(inv) or Decimal(0), paid.get(inv) or Decimal(0))
+            for inv in set(earned) | set(paid)
+        }
+
+    def __str__(self):
+        return f"{self.investor.username}: {self.due} due"
     
-# store/models.py
+# 7. Daily Sales Rollup (day x product x investor x payment method)
+class SalesDailyRollup(models.Model):
+    day = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, related_name='daily_rollups')
+    investor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='daily_rollups')
+    payment_method = models.CharField(max_length=10, choices=Sale.PAYMENT_METHODS)
+
+    sale_count = models.IntegerField(default=0)
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    owner_profit = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    investor_profit = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'product', 'investor', 'payment_method'], name='unique_sales_rollup_key'),
+        ]
+        indexes = [
+            models.Index(fields=['investor', 'day']),
+        ]
+
+    @classmethod
+    def record(cls, sales, sign=1):
+        """Folds a batch of sales into their daily rollup rows (call inside the ledger transaction)."""
+        buckets = {}
+        for sale in sales:
+            key = (
+                timezone.localdate(sale.date),
+                sale.product_id,
+                sale.investor_id,
+                sale.payment_method,
+            )
+            b = buckets.setdefault(key, [0, 0, Decimal(0), Decimal(0), Decimal(0)])
+            b[0] += sign
+            b[1] += sign * sale.quantity
+            b[2] += sign * sale.total_amount
+            b[3] += sign * sale.owner_profit_amount
+            b[4] += sign * sale.investor_profit_amount
+
+        for (day, product_id, investor_id, method), (count, qty, revenue, owner, investor) in buckets.items():
+            key = {'day': day, 'product_id': product_id, 'investor_id': investor_id, 'payment_method': method}
+            increments = {
+                'sale_count': F('sale_count') + count,
+                'quantity': F('quantity') + qty,
+                'revenue': F('revenue') + revenue,
+                'owner_profit': F('owner_profit') + owner,
+                'investor_profit': F('investor_profit') + investor,
+            }
+            rows = cls.objects.filter(**key)
+            if product_id is None:
+                # Deleted products leave one NULL-product row each per day: adjust just one of them
+                rows = cls.objects.filter(pk__in=rows.order_by('pk').values('pk')[:1])
+            if rows.update(**increments):
+                continue
+            try:
+                # First sale for this day/product/method
+                with transaction.atomic():
+                    cls.objects.create(
+                        sale_count=count, quantity=qty, revenue=revenue,
+                        owner_profit=owner, investor_profit=investor, **key
+                    )
+            except IntegrityError:
+                rows.update(**increments)
 
-# store/models.py
+    @classmethod
+    def from_ledger(cls, since=None):
+        """Recomputes unsaved rollup rows from the raw Sale table (optionally from a local day onwards)."""
+        sales = Sale.objects.all()
+        if since:
+            sales = sales.filter(date__gte=timezone.make_aware(datetime.combine(since, time.min)))
 
+        grouped = sales.annotate(day=TruncDate('date')).order_by().values(
+            'day', 'product', 'investor', 'payment_method'
+        ).annotate(
+            sale_count=Count('id'),
+            qty=Sum('quantity'),
+            revenue=Sum('total_amount'),
+            owner_profit=Sum('owner_profit_amount'),
+            investor_profit=Sum('investor_profit_amount')
+        )
+        return [
+            cls(
+                day=row['day'],
+                product_id=row['product'],
+                investor_id=row['investor'],
+                payment_method=row['payment_method'],
+                sale_count=row['sale_count'],
+                quantity=row['qty'],
+                revenue=row['revenue'],
+                owner_profit=row['owner_profit'],
+                investor_profit=row['investor_profit'],
+            )
+            for row in grouped
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.payment_method}: {self.revenue}"
+
+# 8. Product Change Requests (Investor -> Owner approval queue)
 class ProductChangeRequest(models.Model):
     REQUEST_TYPES = [
         ('NEW', 'New Product Listing'),
@@ -172,4 +541,113 @@ class ProductChangeRequest(models.Model):
     admin_note = models.TextField(blank=True, null=True)
 
     def __str__(self):
-        return f"{self.get_request_type_display()} - {self.status}"
\ No newline at end of file
+        return f"{self.get_request_type_display()} - {self.status}"
+
+# 9. Export Jobs (CSV reports produced off the request path by `run_export_jobs`)
+class ExportJob(models.Model):
+    KINDS = [
+        ('SALES', 'Sales Report'),
+        ('INVENTORY', 'Inventory Report'),
+        ('RESTOCK', 'Restock Report'),
+    ]
+    STATUS_CHOICES = [
+        ('PENDING', 'Queued'),
+        ('RUNNING', 'Running'),
+        ('DONE', 'Ready'),
+        ('FAILED', 'Failed'),
+    ]
+
+    requested_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='export_jobs')
+    kind = models.CharField(max_length=10, choices=KINDS)
+    # Filters captured from the sales_history / inventory_list / restock_list query string
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+
+    file_path = models.CharField(max_length=500, blank=True)
+    row_count = models.IntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.pk} - {self.status}"
+
+
+# 10. Search Index (trigrams of product / customer text, kept up to date by signals)
+class SearchGram(models.Model):
+    KINDS = [
+        ('P', 'Product'),
+        ('C', 'Customer'),
+    ]
+
+    kind = models.CharField(max_length=1, choices=KINDS)
+    object_id = models.IntegerField()
+    gram = models.CharField(max_length=3)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id', 'gram'], name='unique_search_gram'),
+        ]
+        indexes = [
+            # Covers the lookup: WHERE kind = ? AND gram IN (...) GROUP BY object_id
+            models.Index(fields=['kind', 'gram', 'object_id'], name='search_gram_lookup_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.object_id} '{self.gram}'"
+
+# 11. Demand Forecasts (one row per product with recent sales, replaced by `refresh_forecasts`)
+class ProductForecast(models.Model):
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name='forecast')
+
+    daily_rate = models.FloatField(help_text="Smoothed units sold per day")
+    trend = models.FloatField(help_text="Change in daily units per day (damped)")
+    next_7_days = models.FloatField()
+    next_30_days = models.FloatField()
+
+    alpha = models.FloatField(help_text="Smoothing factor picked for this product")
+    error = models.FloatField(help_text="One-step-ahead RMSE over the history window")
+    generated_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-next_7_days'], name='forecast_next_7_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.next_7_days:.1f} units / 7 days"
+
+# 12. Restock Recommendations (sales velocity vs stock, recomputed in batches by `refresh_restock`)
+class RestockRecommendation(models.Model):
+    STATUS_CHOICES = [
+        ('OUT', 'Out of Stock'),
+        ('REORDER', 'Reorder Now'),
+        ('OK', 'Covered'),
+        ('IDLE', 'No Recent Sales'),
+    ]
+
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name='restock')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+
+    velocity = models.FloatField(help_text="Units sold per day (recent days weigh more)")
+    stock = models.IntegerField(help_text="Quantity on hand when computed")
+    days_of_cover = models.FloatField(null=True, blank=True, help_text="Days until the stock runs out (empty = not selling)")
+    reorder_point = models.IntegerField(default=0)
+    reorder_qty = models.IntegerField(default=0)
+
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'days_of_cover'], name='restock_status_cover_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.status} ({self.reorder_qty} to order)"
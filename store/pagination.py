@@ -0,0 +1,76 @@
+import base64
+import json
+from datetime import datetime
+from django.db.models import Q
+
+def encode_cursor(moment, tiebreak):
+    """Opaque, URL-safe cursor for a (datetime, tiebreak) sort key."""
+    raw = json.dumps([moment.isoformat(), tiebreak]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(token):
+    """The (datetime, tiebreak) key of a cursor, or None when it is malformed (page 1)."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        moment, tiebreak = json.loads(raw)
+        if not isinstance(tiebreak, (int, str)):
+            return None
+        return datetime.fromisoformat(moment), tiebreak
+    except (ValueError, TypeError):
+        return None
+
+def keyset_page(queryset, after=None, before=None, page_size=50, keys=('date', 'id')):
+    """
+    Newest-first keyset (cursor) pagination on a (datetime, tiebreak) key.
+    Uses `key < cursor` / `key > cursor` predicates instead of OFFSET, so every
+    page costs the same however deep it is. Returns (rows, next_cursor, prev_cursor).
+    """
+    time_key, tie_key = keys
+
+    def cursor_for(row):
+        # Works for model instances and .values() dicts alike
+        get = row.get if isinstance(row, dict) else lambda name: getattr(row, name)
+        return encode_cursor(get(time_key), get(tie_key))
+
+    before_key = decode_cursor(before) if before else None
+    after_key = decode_cursor(after) if after and not before_key else None
+
+    if before_key:
+        # Walking back towards newer rows: read ascending, then flip
+        moment, tie = before_key
+        rows = list(queryset.filter(
+            Q(**{f'{time_key}__gt': moment}) | Q(**{time_key: moment, f'{tie_key}__gt': tie})
+        ).order_by(time_key, tie_key)[:page_size + 1])
+        has_newer = len(rows) > page_size
+        rows = rows[:page_size][::-1]
+        has_older = True
+    else:
+        page = queryset.order_by(f'-{time_key}', f'-{tie_key}')
+        if after_key:
+            moment, tie = after_key
+            page = page.filter(
+                Q(**{f'{time_key}__lt': moment}) | Q(**{time_key: moment, f'{tie_key}__lt': tie})
+            )
+        rows = list(page[:page_size + 1])
+        has_older = len(rows) > page_size
+        rows = rows[:page_size]
+        has_newer = after_key is not None
+
+    next_cursor = cursor_for(rows[-1]) if rows and has_older else None
+    prev_cursor = cursor_for(rows[0]) if rows and has_newer else None
+    return rows, next_cursor, prev_cursor
+
+def cursor_queries(query, next_cursor, prev_cursor):
+    """Querystrings for the Older/Newer links, keeping the page's other filters."""
+    base_query = query.copy()
+    base_query.pop('after', None)
+    base_query.pop('before', None)
+    next_query = prev_query = None
+    if next_cursor:
+        base_query['after'] = next_cursor
+        next_query = base_query.urlencode()
+        base_query.pop('after')
+    if prev_cursor:
+        base_query['before'] = prev_cursor
+        prev_query = base_query.urlencode()
+    return next_query, prev_query
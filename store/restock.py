@@ -0,0 +1,123 @@
+import numpy as np
+from django.db import transaction
+from django.db.models import Max, F
+from django.utils import timezone
+
+from .forecasting import load_sales_matrix
+from .models import Product, RestockRecommendation
+
+VELOCITY_DAYS = 28        # sales history behind the velocity
+HALF_LIFE_DAYS = 7        # a day's sales count half as much every week further back
+LEAD_TIME_DAYS = 7        # ordering -> stock on the shelf
+SAFETY_DAYS = 3           # extra cover against demand spikes
+TARGET_COVER_DAYS = 30    # an order tops stock up to last this long after it arrives
+WRITE_BATCH = 2000
+
+# ==========================================
+# 1. VECTORIZED MATH (all products at once)
+# ==========================================
+def velocities(matrix, half_life=HALF_LIFE_DAYS):
+    """Exponentially weighted units/day per row of a product x day matrix (last column = most recent)."""
+    days = matrix.shape[1]
+    weights = 0.5 ** (np.arange(days)[::-1] / half_life)
+    return matrix @ weights / weights.sum()
+
+def recommend(velocity, stock, threshold):
+    """
+    (status, days_of_cover, reorder_point, reorder_qty) arrays for matching velocity / stock /
+    low_stock_threshold arrays. The reorder point never drops below the product's own threshold.
+    """
+    selling = velocity > 0
+    reorder_point = np.maximum(np.ceil(velocity * (LEAD_TIME_DAYS + SAFETY_DAYS)), threshold)
+    # Slow sellers still get topped up past their threshold
+    order_up_to = np.maximum(np.ceil(velocity * (LEAD_TIME_DAYS + TARGET_COVER_DAYS)), reorder_point + 1)
+
+    days_of_cover = np.where(selling, np.maximum(stock, 0) / np.where(selling, velocity, 1), np.nan)
+    low = stock <= reorder_point
+    status = np.select(
+        [~selling & ~low, stock <= 0, low],
+        ['IDLE', 'OUT', 'REORDER'],
+        default='OK',
+    )
+    needs_order = (status == 'OUT') | (status == 'REORDER')
+    reorder_qty = np.where(needs_order, np.maximum(order_up_to - np.maximum(stock, 0), 0), 0)
+    return status, days_of_cover, reorder_point, reorder_qty
+
+# ==========================================
+# 2. BATCH REFRESH (run by `manage.py refresh_restock`)
+# ==========================================
+def refresh_restock(full=False):
+    """
+    Recomputes restock recommendations and upserts them. Incremental by default: only
+    products changed (stock or details, see Product.updated_at) since the last run.
+    A full pass (nightly) also picks up velocities that moved because the window slid.
+    Returns the number of products recomputed.
+    """
+    started = timezone.now()
+    products = Product.objects.all()
+    last_run = RestockRecommendation.objects.aggregate(last=Max('computed_at'))['last']
+    if not full and last_run:
+        products = products.filter(updated_at__gt=last_run)
+
+    rows = list(products.values_list('pk', 'quantity', 'low_stock_threshold').order_by('pk'))
+    if not rows:
+        return 0
+    pks = np.array([r[0] for r in rows], dtype=np.int64)
+    stock = np.array([r[1] for r in rows], dtype=float)
+    threshold = np.array([r[2] for r in rows], dtype=float)
+
+    # Velocity of every product with sales in the window, matched back onto `pks`
+    ids, matrix = load_sales_matrix(VELOCITY_DAYS, products=None if full else products)
+    velocity = np.zeros(len(pks))
+    if len(ids):
+        pos = np.minimum(np.searchsorted(ids, pks), len(ids) - 1)
+        found = ids[pos] == pks
+        velocity[found] = velocities(matrix)[pos[found]]
+
+    status, cover, reorder_point, reorder_qty = recommend(velocity, stock, threshold)
+    recommendations = [
+        RestockRecommendation(
+            product_id=int(pks[i]),
+            status=str(status[i]),
+            velocity=round(float(velocity[i]), 3),
+            stock=int(stock[i]),
+            days_of_cover=None if np.isnan(cover[i]) else round(float(cover[i]), 1),
+            reorder_point=int(reorder_point[i]),
+            reorder_qty=int(reorder_qty[i]),
+            computed_at=started,
+        )
+        for i in range(len(pks))
+    ]
+
+    with transaction.atomic():
+        # Skip products deleted while we were computing (the foreign key would fail)
+        live = set(Product.objects.filter(pk__in=products.values('pk')).values_list('pk', flat=True))
+        recommendations = [r for r in recommendations if r.product_id in live]
+        RestockRecommendation.objects.bulk_create(
+            recommendations,
+            update_conflicts=True,
+            unique_fields=['product'],
+            update_fields=['status', 'velocity', 'stock', 'days_of_cover', 'reorder_point', 'reorder_qty', 'computed_at'],
+            batch_size=WRITE_BATCH,
+        )
+    return len(recommendations)
+
+# ==========================================
+# 3. READING
+# ==========================================
+NEEDS_ACTION = ('OUT', 'REORDER')
+
+def filter_restock(queryset, params):
+    """Applies the restock_list owner / status filters from `params` (default: items needing an order)."""
+    investor = params.get('investor')
+    if investor and investor != 'all':
+        queryset = queryset.filter(product__investor_id=investor)
+
+    status = params.get('status') or 'action'
+    if status == 'action':
+        queryset = queryset.filter(status__in=NEEDS_ACTION)
+    elif status != 'all':
+        queryset = queryset.filter(status=status)
+
+    # Soonest to run out first; idle products (no cover figure) last
+    return queryset.order_by(F('days_of_cover').asc(nulls_last=True), '-velocity', 'id')
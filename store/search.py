@@ -0,0 +1,194 @@
+from django.db import transaction
+from django.db.models import Q, Case, When, Value, IntegerField, Count
+from django.db.models.functions import Lower
+
+from .models import Product, Customer, SearchGram
+
+GRAM_SIZE = 3
+BATCH_SIZE = 5000
+# A gram shared by this many rows narrows nothing: scanning is as cheap
+GRAM_PROBE_LIMIT = 5000
+# Posting lists intersected per query (the rarest ones)
+MAX_GRAMS = 3
+# Rows re-scored in Python by the typo-tolerant fallback
+FUZZY_CANDIDATES = 200
+
+# Text columns covered by the index, per kind
+SEARCH_FIELDS = {
+    'P': ('name', 'product_id'),
+    'C': ('name', 'mobile', 'email'),
+}
+SEARCH_MODELS = {
+    'P': Product,
+    'C': Customer,
+}
+# (code field, name field) used for ranking
+RANK_FIELDS = {
+    'P': ('product_id', 'name'),
+    'C': ('mobile', 'name'),
+}
+
+def normalize(text):
+    return ' '.join(str(text or '').lower().split())
+
+def grams(text):
+    """Distinct trigrams of the normalized text ('lamp' -> {'lam', 'amp'})."""
+    text = normalize(text)
+    return {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+
+def object_grams(values):
+    found = set()
+    for value in values:
+        found |= grams(value)
+    return found
+
+# ==========================================
+# WRITING (signals + rebuild command)
+# ==========================================
+def index_object(kind, instance):
+    values = [getattr(instance, field) for field in SEARCH_FIELDS[kind]]
+    with transaction.atomic():
+        SearchGram.objects.filter(kind=kind, object_id=instance.pk).delete()
+        SearchGram.objects.bulk_create([
+            SearchGram(kind=kind, object_id=instance.pk, gram=gram) for gram in object_grams(values)
+        ])
+
+def unindex_object(kind, pk):
+    SearchGram.objects.filter(kind=kind, object_id=pk).delete()
+
+def index_objects(kind, queryset):
+    """Adds grams for many rows at once (bulk creates that skip post_save)."""
+    rows = queryset.values_list('pk', *SEARCH_FIELDS[kind])
+    batch = []
+    count = 0
+    for pk, *values in rows.iterator(chunk_size=BATCH_SIZE):
+        batch.extend(SearchGram(kind=kind, object_id=pk, gram=gram) for gram in object_grams(values))
+        count += 1
+        if len(batch) >= BATCH_SIZE:
+            SearchGram.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        SearchGram.objects.bulk_create(batch, ignore_conflicts=True)
+    return count
+
+def reindex_objects(kind, pks):
+    """Refreshes the grams of rows written by bulk_create / bulk_update (no post_save)."""
+    with transaction.atomic():
+        SearchGram.objects.filter(kind=kind, object_id__in=pks).delete()
+        index_objects(kind, SEARCH_MODELS[kind].objects.filter(pk__in=pks))
+
+def rebuild_index(kind):
+    with transaction.atomic():
+        SearchGram.objects.filter(kind=kind).delete()
+        return index_objects(kind, SEARCH_MODELS[kind].objects.all())
+
+# ==========================================
+# READING
+# ==========================================
+def gram_frequencies(kind, query):
+    """
+    [(rows, gram)] for the query's grams, rarest first (counts capped at GRAM_PROBE_LIMIT).
+    One grouped query however long the query is; grams nobody has count 0.
+    """
+    wanted = grams(query)
+    counts = dict(
+        SearchGram.objects.filter(kind=kind, gram__in=wanted).order_by().values('gram')
+        .annotate(n=Count('id')).values_list('gram', 'n')
+    )
+    return sorted((min(counts.get(gram, 0), GRAM_PROBE_LIMIT), gram) for gram in wanted)
+
+def filter_search(queryset, kind, query):
+    """
+    Substring search with the same matches as `icontains` on SEARCH_FIELDS.
+    The posting lists of the query's rarest grams are intersected first, so
+    LIKE only runs on those candidates. Short queries, and queries made only
+    of very common grams, keep the plain LIKE scan (it is the cheaper plan).
+    """
+    query = normalize(query)
+    if not query:
+        return queryset
+
+    match = Q()
+    for field in SEARCH_FIELDS[kind]:
+        match |= Q(**{f'{field}__icontains': query})
+
+    if len(query) >= GRAM_SIZE:
+        counted = gram_frequencies(kind, query)
+        if counted[0][0] == 0:
+            return queryset.none()
+        if counted[0][0] < GRAM_PROBE_LIMIT:
+            for _, gram in counted[:MAX_GRAMS]:
+                queryset = queryset.filter(
+                    pk__in=SearchGram.objects.filter(kind=kind, gram=gram).values('object_id')
+                )
+    return queryset.filter(match)
+
+def search(kind, query, fields, limit=20):
+    """
+    Ranked search for the API: exact code, code prefix, exact name, name prefix,
+    then other substring matches. When nothing contains the query (a typo),
+    rows sharing most of its grams are returned instead, ranked last.
+    `fields` must include 'id' and the kind's name field.
+    """
+    query = normalize(query)
+    if not query:
+        return []
+
+    model = SEARCH_MODELS[kind]
+    code_field, name_field = RANK_FIELDS[kind]
+    rank = Case(
+        When(**{f'{code_field}__iexact': query}, then=Value(0)),
+        When(**{f'{code_field}__istartswith': query}, then=Value(1)),
+        When(**{f'{name_field}__iexact': query}, then=Value(2)),
+        When(**{f'{name_field}__istartswith': query}, then=Value(3)),
+        default=Value(4),
+        output_field=IntegerField(),
+    )
+    results = list(filter_search(model.objects.all(), kind, query).annotate(rank=rank).order_by(
+        'rank', name_field, 'pk'
+    ).values(*fields, 'rank')[:limit])
+    if results or len(query) < GRAM_SIZE:
+        return results
+
+    # Fuzzy fallback: rows holding the two rarest grams that exist at all,
+    # re-ranked in Python by how many of the query's grams they share
+    present = [gram for rows, gram in gram_frequencies(kind, query) if rows]
+    if len(present) < 2:
+        return []
+    candidates = model.objects.all()
+    for gram in present[:2]:
+        candidates = candidates.filter(pk__in=SearchGram.objects.filter(kind=kind, gram=gram).values('object_id'))
+
+    wanted = grams(query)
+    scored = []
+    for row in candidates.values(*SEARCH_FIELDS[kind], *fields)[:FUZZY_CANDIDATES]:
+        shared = len(wanted & object_grams(row[field] for field in SEARCH_FIELDS[kind]))
+        if shared * 2 >= len(wanted):
+            scored.append((-shared, row[name_field], row))
+    scored.sort(key=lambda item: item[:2])
+    return [{**{field: row[field] for field in fields}, 'rank': 5} for _, _, row in scored[:limit]]
+
+# ==========================================
+# PREFIX LOOKUP (POS customer typeahead)
+# ==========================================
+def prefix_range(prefix):
+    """[prefix, next) bounds: a `startswith` any B-tree index can answer."""
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+def customer_prefix_search(query, fields, limit=8):
+    """Customers whose mobile or name starts with `query`, mobile matches first."""
+    query = query.strip()
+    if not query:
+        return []
+
+    low, high = prefix_range(query)
+    results = list(Customer.objects.filter(mobile__gte=low, mobile__lt=high).order_by('mobile').values(*fields)[:limit])
+
+    if len(results) < limit and not query.isdigit():
+        low, high = prefix_range(query.lower())
+        seen = {row['id'] for row in results}
+        by_name = Customer.objects.annotate(name_key=Lower('name')).filter(
+            name_key__gte=low, name_key__lt=high
+        ).order_by('name_key', 'id').values(*fields)[:limit]
+        results += [row for row in by_name if row['id'] not in seen][:limit - len(results)]
+    return results
@@ -0,0 +1,54 @@
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.signals import post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from .models import Product, Customer, Sale, Payout, InvestorBalance, DeletedProduct, sales_recorded
+from .catalog import product_index
+from .search import index_object, unindex_object
+from .analytics import invalidate_top_products
+
+@receiver(post_save, sender=Product)
+def refresh_product_index(sender, instance, **kwargs):
+    # Keep this worker's scan index in step with name / product_id edits
+    product_index.add(instance.pk, instance.product_id, instance.name)
+    index_object('P', instance)
+    # Cached best-seller lists show product names
+    transaction.on_commit(lambda: invalidate_top_products([instance.investor_id]))
+
+@receiver(post_delete, sender=Product)
+def drop_product_from_index(sender, instance, **kwargs):
+    product_index.discard(instance.pk)
+    unindex_object('P', instance.pk)
+    # Leave a tombstone so offline POS catalogs remove it on their next delta
+    DeletedProduct.objects.create(product_pk=instance.pk)
+
+@receiver(pre_delete, sender=Product)
+def drop_product_earnings(sender, instance, **kwargs):
+    # Its sales keep their rows (product set to NULL) but stop counting towards the
+    # investor's balance, the same as InvestorBalance.from_ledger sees them
+    earned = Sale.objects.filter(product=instance).aggregate(t=Sum('investor_profit_amount'))['t']
+    if earned:
+        InvestorBalance.apply(instance.investor_id, earned=-earned)
+
+@receiver(post_delete, sender=Sale)
+def remove_sale_totals(sender, instance, **kwargs):
+    # Runs for queryset deletes (admin "delete selected") as well as Sale.delete()
+    instance.record_totals(sign=-1)
+
+@receiver(post_delete, sender=Payout)
+def remove_payout(sender, instance, **kwargs):
+    InvestorBalance.apply(instance.investor_id, paid=-instance.amount)
+
+@receiver(post_save, sender=Customer)
+def refresh_customer_search(sender, instance, **kwargs):
+    index_object('C', instance)
+
+@receiver(post_delete, sender=Customer)
+def drop_customer_from_search(sender, instance, **kwargs):
+    unindex_object('C', instance.pk)
+
+@receiver(sales_recorded)
+def expire_top_products(sender, investor_ids, **kwargs):
+    # Refresh the cached best sellers once the sales are committed
+    transaction.on_commit(lambda: invalidate_top_products(investor_ids))
@@ -1,3 +1,912 @@
-from django.test import TestCase
+import csv
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import skipUnless
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import sync_to_async
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.paginator import Page
+from django.db import connection, transaction, OperationalError
+from django.db.models import Sum, QuerySet
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .approvals import approve_requests
+from .analytics import filter_by_period, get_top_products, get_dashboard_stats, aget_dashboard_stats
+from .catalog import ProductLookupIndex
+from .checkout import checkout
+from .exports import run_export_job, export_filename
+from .forecasting import fit_smoothing, project, refresh_forecasts
+from .pagination import keyset_page, encode_cursor
+from .restock import refresh_restock
+from .search import filter_search, search
+from .views import INVENTORY_PAGE_SIZE, SALES_PAGE_SIZE, CUSTOMERS_PAGE_SIZE, RECEIPTS_PAGE_SIZE, RESTOCK_PAGE_SIZE
+from .models import (
+    User, Product, Customer, Sale, SalesDailyRollup, InvestorBalance, OutOfStockError,
+    ProductChangeRequest, ExportJob, ProductForecast, RestockRecommendation, Payout,
+)
+
+
+class CheckoutStockTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', password='x', role='OWNER')
+        self.investor = User.objects.create_user('investor', password='x', role='INVESTOR')
+        self.product = Product.objects.create(
+            investor=self.investor, name='Lamp', quantity=5,
+            buying_price=Decimal('10.00'), selling_price=Decimal('15.00')
+        )
+
+    def test_short_cart_is_rejected_without_touching_stock(self):
+        other = Product.objects.create(
+            investor=self.investor, name='Vase', quantity=10,
+            buying_price=Decimal('1.00'), selling_price=Decimal('2.00')
+        )
+        cart = [{'product_id': other.id, 'quantity': 3}, {'product_id': self.product.id, 'quantity': 6}]
+
+        with self.assertRaises(OutOfStockError) as ctx:
+            checkout(cart, seller=self.owner)
+
+        self.assertEqual(ctx.exception.shortages, [('Lamp', 5, 6)])
+        other.refresh_from_db()
+        self.product.refresh_from_db()
+        self.assertEqual((other.quantity, self.product.quantity), (10, 5))
+        self.assertFalse(Sale.objects.exists())
+
+    def test_sale_save_uses_guarded_decrement(self):
+        Sale.objects.create(product=self.product, sold_by=self.owner, quantity=5)
+        with self.assertRaises(OutOfStockError):
+            Sale.objects.create(product=self.product, sold_by=self.owner, quantity=1)
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 0)
+        self.assertEqual(Sale.objects.count(), 1)
+
+
+class InvestorBalanceTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', password='x', role='OWNER')
+        self.investor = User.objects.create_user('investor', password='x', role='INVESTOR')
+        self.product = Product.objects.create(
+            investor=self.investor, name='Lamp', quantity=10,
+            buying_price=Decimal('10.00'), selling_price=Decimal('15.00')
+        )
+        checkout([{'product_id': self.product.id, 'quantity': 2}], seller=self.owner)
+        self.payout = Payout.objects.create(investor=self.investor, amount=Decimal('20.00'))
+
+    def balance(self):
+        balance = InvestorBalance.objects.get(investor=self.investor)
+        return balance.earned, balance.paid, balance.due
+
+    def assertInSyncWithLedger(self):
+        out = StringIO()
+        call_command('rebuild_balances', check=True, stdout=out)
+        self.assertIn('0 balance(s) out of sync', out.getvalue())
+
+    def test_payout_edit_applies_the_difference(self):
+        self.payout.amount = Decimal('50.00')
+        self.payout.save()
+        self.assertEqual(self.balance(), (Decimal('27.00'), Decimal('50.00'), Decimal('-23.00')))
+        self.assertInSyncWithLedger()
+
+    def test_queryset_deletes_update_the_balance(self):
+        Payout.objects.all().delete()
+        self.assertEqual(self.balance(), (Decimal('27.00'), Decimal('0.00'), Decimal('27.00')))
+
+        Sale.objects.all().delete()
+        self.assertEqual(self.balance(), (Decimal('0.00'), Decimal('0.00'), Decimal('0.00')))
+        self.assertInSyncWithLedger()
+
+    def test_product_delete_drops_its_earnings(self):
+        self.product.delete()
+        self.assertEqual(self.balance(), (Decimal('0.00'), Decimal('20.00'), Decimal('-20.00')))
+        self.assertInSyncWithLedger()
+
+        # Its orphaned sales count for nobody, so removing them changes nothing
+        Sale.objects.all().delete()
+        self.assertEqual(self.balance()[0], Decimal('0.00'))
+        self.assertInSyncWithLedger()
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.investor = User.objects.create_user('investor', password='x', role='INVESTOR')
+        self.kettle, self.lamp, self.pan = [
+            Product.objects.create(
+                investor=self.investor, name=name, quantity=5,
+                buying_price=Decimal('10.00'), selling_price=Decimal('15.00')
+            )
+            for name in ('Stainless Steel Kettle With Whistle', 'Desk Lamp', 'Steel Pan')
+        ]
+
+    def names(self, queryset):
+        return sorted(queryset.values_list('name', flat=True))
+
+    def test_filter_search_hits_and_misses(self):
+        products = Product.objects.all()
+        self.assertEqual(self.names(filter_search(products, 'P', 'steel')), ['Stainless Steel Kettle With Whistle', 'Steel Pan'])
+        self.assertEqual(self.names(filter_search(products, 'P', self.lamp.product_id.lower())), ['Desk Lamp'])
+        self.assertEqual(self.names(filter_search(products, 'P', 'teapot')), [])
+        # Every gram is indexed but they never appear together
+        self.assertEqual(self.names(filter_search(products, 'P', 'steel lamp')), [])
+
+    def test_short_query_falls_back_to_like(self):
+        with self.assertNumQueries(1):
+            found = self.names(filter_search(Product.objects.all(), 'P', 'pa'))
+        self.assertEqual(found, ['Steel Pan'])
+
+    def test_query_count_does_not_grow_with_query_length(self):
+        for query in ('kettle', 'stainless steel kettle', 'stainless steel kettle with whistle'):
+            with self.subTest(query), self.assertNumQueries(2):
+                list(filter_search(Product.objects.all(), 'P', query))
+
+    def test_product_admin_also_matches_the_owner(self):
+        owner = User.objects.create_superuser('boss', password='x', role='OWNER')
+        self.client.force_login(owner)
+        for term, expected in (('investor', 3), ('lamp', 1), ('nobody', 0)):
+            with self.subTest(term):
+                response = self.client.get(reverse('admin:store_product_changelist'), {'q': term})
+                self.assertEqual(response.context['cl'].result_count, expected)
+
+    def test_search_ranks_and_falls_back_to_fuzzy(self):
+        results = search('P', 'steel', ['id', 'name'])
+        self.assertEqual([(r['name'], r['rank']) for r in results], [('Steel Pan', 3), ('Stainless Steel Kettle With Whistle', 4)])
+
+        fuzzy = search('P', 'kettel', ['id', 'name'])
+        self.assertEqual([(r['name'], r['rank']) for r in fuzzy], [('Stainless Steel Kettle With Whistle', 5)])
+        self.assertEqual(search('P', 'zzz', ['id', 'name']), [])
+
+
+class ProductLookupIndexTests(TestCase):
+    def setUp(self):
+        self.investor = User.objects.create_user('investor', password='x', role='INVESTOR')
+        self.product = Product.objects.create(
+            investor=self.investor, name='Desk Lamp', quantity=5,
+            buying_price=Decimal('10.00'), selling_price=Decimal('15.00')
+        )
+        self.index = ProductLookupIndex()
+
+    def test_lookup_fills_the_index_on_a_miss(self):
+        with self.assertNumQueries(1):
+            found = self.index.lookup(f' {self.product.product_id.lower()} ')
+        self.assertEqual((found['id'], found['stock']), (self.product.pk, 5))
+
+        # Resolved from the index: one primary-key read, fresh stock
+        Product.objects.filter(pk=self.product.pk).update(quantity=3)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.index.lookup(self.product.product_id)['stock'], 3)
+        self.assertIsNone(self.index.lookup('no such thing'))
+
+    def test_stale_entry_falls_back_to_the_database(self):
+        self.index.lookup('desk lamp')
+        # Renamed by another worker: no signal reaches this index
+        Product.objects.filter(pk=self.product.pk).update(name='Floor Lamp')
+
+        self.assertIsNone(self.index.lookup('desk lamp'))
+        self.assertIsNone(self.index.resolve('desk lamp'))
+        self.assertEqual(self.index.lookup('floor lamp')['id'], self.product.pk)
+
+    def test_invalidate_forgets_entries(self):
+        self.index.lookup('desk lamp')
+        self.index.invalidate()
+        self.assertIsNone(self.index.resolve('desk lamp'))
+        with self.assertNumQueries(1):
+            self.assertEqual(self.index.lookup('desk lamp')['id'], self.product.pk)
+
+    def test_unknown_codes_are_remembered(self):
+        self.assertIsNone(self.index.lookup('NOPE123'))
+        with self.assertNumQueries(0):
+            self.assertIsNone(self.index.lookup('nope123'))
+            self.assertEqual(self.index.lookup_many(['nope123']), {'nope123': None})
+
+        # A product saved in this worker clears the remembered miss
+        added = Product.objects.create(
+            investor=self.investor, name='Nope123', quantity=1,
+            buying_price=Decimal('1.00'), selling_price=Decimal('2.00')
+        )
+        self.index.add(added.pk, added.product_id, added.name)
+        self.assertEqual(self.index.lookup('nope123')['id'], added.pk)
+
+    def test_expired_miss_asks_the_database_again(self):
+        index = ProductLookupIndex(miss_ttl=0)
+        self.assertIsNone(index.lookup('nope123'))
+        with self.assertNumQueries(1):
+            self.assertIsNone(index.lookup('nope123'))
+
+    @skipUnless(connection.vendor in ('sqlite', 'postgresql'), 'EXPLAIN output is checked for SQLite and Postgres')
+    def test_fallback_uses_the_lower_indexes(self):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = ProductLookupIndex.find_rows(['desk lamp']).explain()
+        self.assertIn('product_code_lower_idx', plan)
+        self.assertIn('product_name_lower_idx', plan)
+
+    async def test_alookup_matches_lookup(self):
+        found = await self.index.alookup('Desk Lamp')
+        self.assertEqual(found['custom_id'], self.product.product_id)
+
+
+class DashboardStatsTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', password='x', role='OWNER')
+        self.investor = User.objects.create_user('investor', password='x', role='INVESTOR')
+        product = Product.objects.create(
+            investor=self.investor, name='Lamp', quantity=10,
+            buying_price=Decimal('10.00'), selling_price=Decimal('15.00')
+        )
+        checkout([{'product_id': product.id, 'quantity': 2}], seller=self.owner)
+
+    async def test_async_stats_match_the_sync_ones(self):
+        stats = await aget_dashboard_stats(self.investor)
+        self.assertEqual(stats, await sync_to_async(get_dashboard_stats)(self.investor))
+        self.assertEqual(stats['financials'][0]['investor'], self.investor)
+        self.assertEqual((stats['total_earned'], stats['my_champion']), (Decimal('27.00'), 'Lamp'))
+
+    def test_async_endpoint_hides_other_investors_from_non_owners(self):
+        other = User.objects.create_user('other', password='x', role='INVESTOR')
+        Payout.objects.create(investor=other, amount=Decimal('5.00'))
+        staff = User.objects.create_user('staff', password='x', role='STAFF')
+
+        for user in (self.investor, staff):
+            with self.subTest(user.role):
+                self.client.force_login(user)
+                stats = self.client.get(reverse('api_dashboard_stats_async')).json()
+                self.assertNotIn('financials', stats)
+                self.assertNotIn('owner_net_income', stats)
+        self.assertEqual(stats['total_paid'], 0)
+
+        self.client.force_login(self.investor)
+        self.assertEqual(self.client.get(reverse('api_dashboard_stats_async')).json()['total_earned'], '27.00')
+
+        self.client.force_login(self.owner)
+        stats = self.client.get(reverse('api_dashboard_stats_async')).json()
+        self.assertEqual(sorted(row['investor'] for row in stats['financials']), ['investor', 'other'])
+
+
+class ExportJobTests(TestCase):
+    def setUp(self):
+        self.export_root = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(EXPORT_ROOT=self.export_root))
+        self.owner = User.objects.create_user('owner', password='x', role='OWNER')
+        investor = User.objects.create_user('investor', password='x', role='INVESTOR')
+        for name in ('Lamp', 'Vase'):
+            product = Product.objects.create(
+                investor=investor, name=name, quantity=10,
+                buying_price=Decimal('10.00'), selling_price=Decimal('15.00')
+            )
+            checkout([{'product_id': product.id, 'quantity': 1}], seller=self.owner)
+
+    def test_queued_jobs_are_built_by_the_worker(self):
+        self.client.force_login(self.owner)
+        self.client.get(reverse('export_sales_csv'), {'filter': 'today'})
+        self.client.get(reverse('export_inventory_csv'), {'search': 'lamp', 'gzip': '1'})
+        sales_job, inventory_job = ExportJob.objects.order_by('pk')
+        self.assertEqual((sales_job.status, sales_job.params), ('PENDING', {'filter': 'today'}))
+
+        call_command('run_export_jobs', once=True, stdout=StringIO())
+
+        sales_job.refresh_from_db()
+        self.assertEqual((sales_job.status, sales_job.row_count), ('DONE', 2))
+        with open(sales_job.file_path, newline='') as fh:
+            rows = list(csv.reader(fh))
+        self.assertEqual(rows[0][0], 'Date')
+        self.assertEqual(sorted(row[2] for row in rows[1:]), ['Lamp', 'Vase'])
+
+        inventory_job.refresh_from_db()
+        self.assertEqual((inventory_job.status, inventory_job.row_count), ('DONE', 1))
+        with gzip.open(inventory_job.file_path, 'rt', newline='') as fh:
+            self.assertEqual([row[1] for row in csv.reader(fh)], ['Name', 'Lamp'])
+
+    def test_jobs_abandoned_by_a_dead_worker_are_failed(self):
+        hour_ago = timezone.now() - timedelta(hours=1)
+        stale = ExportJob.objects.create(requested_by=self.owner, kind='SALES', status='RUNNING', started_at=hour_ago)
+        fresh = ExportJob.objects.create(requested_by=self.owner, kind='SALES', status='RUNNING', started_at=timezone.now())
+        partial = Path(self.export_root) / (export_filename(stale) + '.part')
+        stray = Path(self.export_root) / 'inventory_report_old.csv.part'
+        for path in (partial, stray):
+            path.write_text('Date,')
+        os.utime(stray, (hour_ago.timestamp(), hour_ago.timestamp()))
+
+        call_command('run_export_jobs', once=True, stdout=StringIO())
+
+        stale.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual((stale.status, fresh.status), ('FAILED', 'RUNNING'))
+        self.assertIn('stopped', stale.error)
+        self.assertFalse(partial.exists() or stray.exists())
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user('owner', password='x', role='OWNER')
+        product = Product.objects.create(
+            investor=owner, name='Lamp', quantity=10,
+            buying_price=Decimal('10.00'), selling_price=Decimal('15.00')
+        )
+        self.sales = [Sale.objects.create(product=product, sold_by=owner, quantity=1) for _ in range(5)]
+        # Three sales share one timestamp, so only the id breaks the tie
+        noon = timezone.now().replace(hour=12, minute=0, second=0, microsecond=0)
+        for sale, moment in zip(self.sales, [noon - timedelta(hours=1), noon, noon, noon, noon + timedelta(hours=1)]):
+            Sale.objects.filter(pk=sale.pk).update(date=moment)
+        self.newest_first = [s.pk for s in self.sales[::-1]]
+
+    def page(self, **cursor):
+        rows, next_cursor, prev_cursor = keyset_page(Sale.objects.all(), page_size=2, **cursor)
+        return [row.pk for row in rows], next_cursor, prev_cursor
+
+    def test_forward_and_back_through_ties(self):
+        first, after, prev = self.page()
+        self.assertEqual((first, prev), (self.newest_first[:2], None))
+
+        second, after, before = self.page(after=after)
+        self.assertEqual(second, self.newest_first[2:4])
+
+        third, end, _ = self.page(after=after)
+        self.assertEqual((third, end), (self.newest_first[4:], None))
+
+        back, _, newer = self.page(before=before)
+        self.assertEqual((back, newer), (first, None))
+
+    def test_malformed_cursor_falls_back_to_the_first_page(self):
+        first = self.page()[0]
+        for cursor in ('not-a-cursor', '!!', encode_cursor(timezone.now(), 1)[:-3], 'WzEsIDJd', 'WyIyMDI0LTAxLTAxIiwgWzFdXQ'):
+            with self.subTest(cursor):
+                self.assertEqual(self.page(after=cursor)[0], first)
+                self.assertEqual(self.page(before=cursor)[0], first)
+
+        self.client.force_login(User.objects.get(username='owner'))
+        response = self.client.get(reverse('sales_history'), {'after': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 200)
+
+
+class CustomerUpsertTests(TestCase):
+    def test_new_customer_is_created(self):
+        customer = Customer.upsert('01710000001', 'Rahim')
+        self.assertEqual((customer.mobile, customer.name), ('01710000001', 'Rahim'))
+        self.assertEqual(Customer.upsert('01710000002').name, 'Unknown')
+
+    def test_existing_mobile_updates_only_a_changed_name(self):
+        customer = Customer.upsert('01710000001', 'Rahim')
+
+        with self.assertNumQueries(1):
+            self.assertEqual(Customer.upsert('01710000001', 'Rahim').pk, customer.pk)
+        with self.assertNumQueries(1):
+            Customer.upsert('01710000001')
+
+        with CaptureQueriesContext(connection) as ctx:
+            renamed = Customer.upsert('01710000001', 'Rahim Uddin')
+        updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE "store_customer"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(renamed.pk, customer.pk)
+        self.assertEqual(Customer.objects.get().name, 'Rahim Uddin')
+
+    def test_blank_mobile_is_a_walk_in(self):
+        with self.assertNumQueries(0):
+            self.assertIsNone(Customer.upsert('  ', 'Rahim'))
+            self.assertIsNone(Customer.upsert(None))
+        self.assertFalse(Customer.objects.exists())
+
+
+class ApprovalTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', password='x', role='OWNER')
+        self.investor = User.objects.create_user('investor', password='x', role='INVESTOR')
+        self.lamp = Product.objects.create(
+            investor=self.investor, name='Lamp', quantity=5,
+            buying_price=Decimal('10.00'), selling_price=Decimal('15.00')
+        )
+
+    def request(self, request_type='NEW', target=None, name='Vase', selling_price=Decimal('9.00')):
+        return ProductChangeRequest.objects.create(
+            requester=self.investor, request_type=request_type, target_product=target, name=name,
+            quantity=10, buying_price=Decimal('5.00'), selling_price=selling_price
+        )
+
+    def outcomes(self, report):
+        return [(row['name'], row['outcome']) for row in report]
+
+    def test_approve_creates_and_edits_products(self):
+        self.request()
+        self.request('EDIT', self.lamp, name='Desk Lamp')
+
+        report = approve_requests(ProductChangeRequest.objects.all())
+
+        self.assertEqual(self.outcomes(report), [('Vase', 'CREATED'), ('Desk Lamp', 'UPDATED')])
+        vase = Product.objects.get(product_id=report[0]['product_id'])
+        self.assertEqual((vase.name, vase.investor, vase.quantity), ('Vase', self.investor, 10))
+        self.lamp.refresh_from_db()
+        self.assertEqual((self.lamp.name, self.lamp.selling_price), ('Desk Lamp', Decimal('9.00')))
+        self.assertEqual(set(ProductChangeRequest.objects.values_list('status', flat=True)), {'APPROVED'})
+
+    def test_reject_leaves_the_product_alone(self):
+        req = self.request('EDIT', self.lamp, name='Desk Lamp')
+        self.client.force_login(self.owner)
+        # Approvals and rejections only happen on POST
+        for name in ('approve_request', 'reject_request'):
+            self.assertEqual(self.client.get(reverse(name, args=[req.pk])).status_code, 405)
+        self.assertEqual(self.client.get(reverse('approve_all_requests')).status_code, 405)
+        self.assertEqual(ProductChangeRequest.objects.get().status, 'PENDING')
+
+        self.client.post(reverse('reject_request', args=[req.pk]))
+
+        req.refresh_from_db()
+        self.lamp.refresh_from_db()
+        self.assertEqual((req.status, self.lamp.name), ('REJECTED', 'Lamp'))
+        # Already decided: approving it later does nothing
+        self.assertEqual(approve_requests(ProductChangeRequest.objects.all()), [])
+
+    def test_mixed_batch_rejects_only_the_bad_requests(self):
+        self.request()
+        self.request('EDIT', self.lamp, name='Old Lamp')
+        self.request('EDIT', self.lamp, name='New Lamp')
+        bad = self.request(name='x' * 201)
+        bad_edit = self.request('EDIT', self.lamp, name='')
+
+        report = approve_requests(ProductChangeRequest.objects.all())
+
+        self.assertEqual(self.outcomes(report), [
+            ('Vase', 'CREATED'), ('Old Lamp', 'SUPERSEDED'), ('New Lamp', 'UPDATED'),
+            ('x' * 201, 'REJECTED'), ('', 'REJECTED'),
+        ])
+        self.assertTrue(report[3]['note'].startswith('name:'))
+
+        # The bad requests wrote nothing; the good ones still applied
+        self.assertEqual(sorted(Product.objects.values_list('name', flat=True)), ['New Lamp', 'Vase'])
+        bad.refresh_from_db()
+        bad_edit.refresh_from_db()
+        self.assertEqual((bad.status, bad.admin_note), ('REJECTED', report[3]['note']))
+        self.assertEqual(bad_edit.status, 'REJECTED')
+
+
+class DerivedTablesAdminTests(TestCase):
+    def test_derived_tables_are_read_only_in_the_admin(self):
+        self.client.force_login(User.objects.create_superuser('boss', password='x', role='OWNER'))
+        for model in ('investorbalance', 'salesdailyrollup', 'productforecast', 'restockrecommendation'):
+            with self.subTest(model):
+                self.assertEqual(self.client.get(reverse(f'admin:store_{model}_changelist')).status_code, 200)
+                self.assertEqual(self.client.get(reverse(f'admin:store_{model}_add')).status_code, 403)
+
+
+class SalesRollupTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', password='x', role='OWNER')
+        self.investor = User.objects.create_user('investor', password='x', role='INVESTOR')
+        self.lamp, self.vase = [
+            Product.objects.create(
+                investor=self.investor, name=name, quantity=10,
+                buying_price=Decimal('10.00'), selling_price=Decimal('15.00')
+            )
+            for name in ('Lamp', 'Vase')
+        ]
+        for product in (self.lamp, self.lamp, self.vase):
+            checkout([{'product_id': product.id, 'quantity': 1}], seller=self.owner)
+
+    def assertMatchesLedger(self):
+        # Deleted products can leave several NULL-product rows per key: compare the sums
+        def totals(rows):
+            summed = {}
+            for row in rows:
+                key = (row.day, row.product_id, row.investor_id, row.payment_method)
+                count, qty, revenue = summed.get(key, (0, 0, Decimal(0)))
+                summed[key] = (count + row.sale_count, qty + row.quantity, revenue + row.revenue)
+            return {key: value for key, value in summed.items() if value[0]}
+        self.assertEqual(totals(SalesDailyRollup.objects.all()), totals(SalesDailyRollup.from_ledger()))
+
+    def test_deleting_a_sale_of_a_deleted_product_debits_its_investor(self):
+        self.lamp.delete()
+        self.vase.delete()
+        Sale.objects.filter(total_amount=Decimal('15.00')).first().delete()
+
+        rows = SalesDailyRollup.objects.order_by('pk')
+        self.assertEqual([(r.product_id, r.investor_id) for r in rows], [(None, self.investor.pk)] * 2)
+        self.assertEqual(sum(r.quantity for r in rows), 2)
+        self.assertTrue(all(r.quantity >= 0 for r in rows))
+        self.assertMatchesLedger()
+
+        Sale.objects.all().delete()
+        self.assertEqual(SalesDailyRollup.objects.aggregate(q=Sum('quantity'))['q'], 0)
+
+
+class ConcurrentCheckoutStressTest(TransactionTestCase):
+    """
+    Hammers one product from many simulated tills to prove stock is never oversold.
+    Kept small so it runs on every backend; `bench_concurrency --checkout` measures throughput.
+    """
+    TILLS = 4
+    CHECKOUTS_PER_TILL = 6
+    STOCK = 12
+
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', password='x', role='OWNER')
+        self.investor = User.objects.create_user('investor', password='x', role='INVESTOR')
+        self.product = Product.objects.create(
+            investor=self.investor, name='Hot Item', quantity=self.STOCK,
+            buying_price=Decimal('10.00'), selling_price=Decimal('15.00')
+        )
+
+    def run_till(self, results):
+        sold = rejected = 0
+        try:
+            for _ in range(self.CHECKOUTS_PER_TILL):
+                while True:
+                    try:
+                        checkout([{'product_id': self.product.id, 'quantity': 1}], seller=self.owner)
+                        sold += 1
+                    except OutOfStockError:
+                        rejected += 1
+                    except OperationalError:
+                        # SQLite serializes writers ("database is locked"), the till retries
+                        time.sleep(0.001)
+                        continue
+                    break
+        finally:
+            results.append((sold, rejected))
+            connection.close()
+
+    def test_no_oversell_under_concurrency(self):
+        results = []
+        tills = [threading.Thread(target=self.run_till, args=(results,)) for _ in range(self.TILLS)]
+
+        for till in tills:
+            till.start()
+        for till in tills:
+            till.join()
+
+        sold = sum(r[0] for r in results)
+        rejected = sum(r[1] for r in results)
+        attempts = self.TILLS * self.CHECKOUTS_PER_TILL
+
+        self.product.refresh_from_db()
+        self.assertEqual(len(results), self.TILLS)
+        self.assertEqual(sold + rejected, attempts)
+        self.assertEqual(sold, self.STOCK)
+        self.assertEqual(self.product.quantity, 0)
+        self.assertEqual(Sale.objects.aggregate(q=Sum('quantity'))['q'], self.STOCK)
+        self.assertEqual(SalesDailyRollup.objects.aggregate(q=Sum('quantity'))['q'], self.STOCK)
+        self.assertEqual(
+            InvestorBalance.objects.get(investor=self.investor).earned,
+            Sale.objects.aggregate(t=Sum('investor_profit_amount'))['t']
+        )
+
+    def test_bench_command_reports_throughput(self):
+        out = StringIO()
+        call_command('bench_concurrency', checkout=True, tills=2, per_till=3, stock=4, json=True, stdout=out)
+        report = json.loads(out.getvalue())
+
+        self.assertEqual((report['sold'], report['rejected'], report['stock_left']), (4, 2, 0))
+        self.assertGreater(report['checkouts_per_s'], 0)
+        # The scratch product and its sales are gone, balances back where they were
+        self.assertFalse(Sale.objects.exists())
+        self.assertEqual(Product.objects.get().pk, self.product.pk)
+        self.assertEqual(InvestorBalance.objects.get(investor=self.investor).earned, 0)
+
+
+@skipUnless(connection.vendor in ('sqlite', 'postgresql'), 'EXPLAIN output is checked for SQLite and Postgres')
+class SaleQueryPlanTests(TestCase):
+    """EXPLAIN-based checks that the ledger's real query shapes hit the composite indexes."""
+
+    def explain(self, queryset):
+        if connection.vendor == 'postgresql':
+            # Tiny test tables would otherwise always be sequentially scanned
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = self.explain(queryset)
+        self.assertIn(index_name, plan, f"Expected {index_name} in plan:\n{plan}")
+
+    def test_period_filter_is_a_sargable_range(self):
+        sales = filter_by_period(Sale.objects.all(), 'week')
+        sql = str(sales.query)
+        self.assertNotIn('django_datetime_cast_date', sql)
+        self.assertNotIn('::date', sql)
+        self.assertUsesIndex(sales, 'sale_date_id_idx')
+
+    def test_ledger_page_uses_date_id_index(self):
+        self.assertUsesIndex(Sale.objects.order_by('-date', '-id')[:51], 'sale_date_id_idx')
+
+    def test_receipt_lookup_uses_transaction_index(self):
+        self.assertUsesIndex(Sale.objects.filter(transaction_id='ABCD1234'), 'sale_transaction_idx')
+
+    def test_payment_method_totals_use_method_date_index(self):
+        since = timezone.now() - timedelta(days=30)
+        self.assertUsesIndex(
+            Sale.objects.filter(payment_method='CASH', date__gte=since).values('payment_method').annotate(t=Sum('total_amount')),
+            'sale_method_date_idx'
+        )
+
+    def test_product_history_uses_product_date_index(self):
+        since = timezone.now() - timedelta(days=30)
+        self.assertUsesIndex(Sale.objects.filter(product_id=1, date__gte=since), 'sale_product_date_idx')
+
+
+class ViewQueryBudgetTests(TestCase):
+    """
+    Seeds a fixed dataset (larger than one page everywhere) and holds every view to a
+    query budget and a cap on the rows it renders, so N+1 loops and unbounded lists fail the suite.
+    """
+    PRODUCTS = 55
+    CUSTOMERS = 55
+    RECEIPTS = 20       # x 3 lines = 60 sale lines
+    CHANGE_REQUESTS = 8
+
+    @classmethod
+    def setUpClass(cls):
+        # The export job written in setUpTestData goes to a throwaway EXPORT_ROOT
+        export_root = cls.enterClassContext(tempfile.TemporaryDirectory())
+        cls.enterClassContext(override_settings(EXPORT_ROOT=export_root))
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='x', role='OWNER')
+        cls.investors = [User.objects.create_user(f'investor{i}', password='x', role='INVESTOR') for i in range(3)]
+        cls.products = [
+            Product.objects.create(
+                investor=cls.investors[i % 3], name=f'Item {i}', quantity=100,
+                buying_price=Decimal('10.00'), selling_price=Decimal('15.00')
+            )
+            for i in range(cls.PRODUCTS)
+        ]
+        cls.customers = [Customer.upsert(f'0171{i:07d}', f'Customer {i}') for i in range(cls.CUSTOMERS)]
+
+        for i in range(cls.RECEIPTS):
+            cart = [{'product_id': cls.products[(i + n) % cls.PRODUCTS].pk, 'quantity': 1} for n in range(3)]
+            checkout(cart, seller=cls.owner, customer=cls.customers[i % 3])
+
+        for i in range(cls.CHANGE_REQUESTS):
+            product = cls.products[i]
+            ProductChangeRequest.objects.create(
+                requester=product.investor, request_type='EDIT' if i % 2 else 'NEW',
+                target_product=product if i % 2 else None, name=f'Requested {i}', quantity=10,
+                buying_price=Decimal('5.00'), selling_price=Decimal('9.00')
+            )
+
+        cls.job = run_export_job(ExportJob.objects.create(requested_by=cls.owner, kind='SALES'))
+        refresh_restock(full=True)
+
+    def budgets(self):
+        """(label, user, method, url, data, max queries, max rendered rows)"""
+        owner, investor = self.owner, self.investors[0]
+        product, customer = self.products[0], self.customers[0]
+        request_id = ProductChangeRequest.objects.filter(status='PENDING').order_by('pk').first().pk
+        cart = json.dumps({
+            'items': [{'product_id': product.pk, 'quantity': 1}, {'product_id': self.products[1].pk, 'quantity': 2}],
+            'customer': {'name': customer.name, 'contact': customer.mobile},
+        })
+        return [
+            ('dashboard', owner, 'get', reverse('dashboard'), {}, 12, 50),
+            ('dashboard (investor)', investor, 'get', reverse('dashboard'), {}, 11, 50),
+            ('add_product', investor, 'get', reverse('add_product'), {}, 2, 0),
+            ('edit_product', owner, 'get', reverse('edit_product', args=[product.pk]), {}, 3, 0),
+            ('inventory_list', owner, 'get', reverse('inventory_list'), {}, 5, INVENTORY_PAGE_SIZE),
+            ('inventory_list (search)', owner, 'get', reverse('inventory_list'), {'search': 'Item 1'}, 9, INVENTORY_PAGE_SIZE),
+            ('export_inventory_csv', owner, 'get', reverse('export_inventory_csv'), {}, 3, 0),
+            ('api_inventory_valuation', owner, 'get', reverse('api_inventory_valuation'), {}, 3, 0),
+            ('api_product_lookup', owner, 'get', reverse('api_product_lookup'), {'q': product.product_id}, 4, 0),
+            ('api_product_lookup_batch', owner, 'get', reverse('api_product_lookup_batch'), {'q': [p.product_id for p in self.products[:5]]}, 3, 0),
+            ('api_catalog', owner, 'get', reverse('api_catalog'), {}, 5, 0),
+            ('api_search', owner, 'get', reverse('api_search'), {'q': 'Item'}, 5, 0),
+            ('api_customer_lookup', owner, 'get', reverse('api_customer_lookup'), {'q': '0171'}, 3, 0),
+            ('sell_product', owner, 'get', reverse('sell_product'), {}, 3, 5),
+            ('sell_product (checkout)', owner, 'post', reverse('sell_product'), cart, 15, 0),
+            ('sales_history', owner, 'get', reverse('sales_history'), {}, 5, SALES_PAGE_SIZE),
+            ('export_sales_csv', owner, 'get', reverse('export_sales_csv'), {}, 3, 0),
+            ('restock_list', owner, 'get', reverse('restock_list'), {'status': 'all'}, 6, RESTOCK_PAGE_SIZE),
+            ('restock_list (investor)', investor, 'get', reverse('restock_list'), {}, 6, RESTOCK_PAGE_SIZE),
+            ('export_restock_csv', owner, 'get', reverse('export_restock_csv'), {}, 3, 0),
+            ('export_job_detail', owner, 'get', reverse('export_job_detail', args=[self.job.pk]), {}, 4, 1),
+            ('export_job_download', owner, 'get', reverse('export_job_download', args=[self.job.pk]), {}, 3, 0),
+            ('profile', owner, 'get', reverse('profile'), {}, 2, 0),
+            ('customer_list', owner, 'get', reverse('customer_list'), {}, 4, CUSTOMERS_PAGE_SIZE),
+            ('customer_profile', owner, 'get', reverse('customer_profile', args=[customer.pk]), {}, 5, RECEIPTS_PAGE_SIZE),
+            ('pay_investor', owner, 'get', reverse('pay_investor', args=[investor.pk]), {}, 3, 0),
+            ('pay_investor (payout)', owner, 'post', reverse('pay_investor', args=[investor.pk]), {'amount': '5.00'}, 7, 0),
+            ('admin_approval_list', owner, 'get', reverse('admin_approval_list'), {}, 3, self.CHANGE_REQUESTS),
+            ('approve_request', owner, 'post', reverse('approve_request', args=[request_id]), {}, 15, 0),
+            ('reject_request', owner, 'post', reverse('reject_request', args=[request_id]), {}, 4, 0),
+            ('approve_all_requests', owner, 'post', reverse('approve_all_requests'), {}, 15, self.CHANGE_REQUESTS),
+            ('reject_all_requests', owner, 'post', reverse('reject_all_requests'), {}, 4, 0),
+            ('my_requests', investor, 'get', reverse('my_requests'), {}, 3, self.CHANGE_REQUESTS),
+            ('api_product_lookup_async', owner, 'get', reverse('api_product_lookup_async'), {'q': product.product_id}, 3, 0),
+            ('sell_product_async', owner, 'post', reverse('sell_product_async'), cart, 15, 0),
+            ('api_dashboard_stats_async', owner, 'get', reverse('api_dashboard_stats_async'), {}, 6, 0),
+        ]
+
+    def rendered_rows(self, response):
+        """Size of the largest evaluated queryset / page / list handed to the template."""
+        contexts = response.context if isinstance(response.context, list) else [response.context]
+        largest = 0
+        for context in filter(None, contexts):
+            for value in context.flatten().values():
+                if isinstance(value, Page):
+                    value = value.object_list
+                if isinstance(value, QuerySet):
+                    value = value._result_cache  # None = never rendered
+                if isinstance(value, (list, tuple)):
+                    largest = max(largest, len(value))
+        return largest
+
+    def test_views_stay_within_query_budget(self):
+        cache.clear()  # Budgets are for a cold cache
+        for label, user, method, url, data, max_queries, max_rows in self.budgets():
+            with self.subTest(label):
+                self.client.force_login(user)
+                kwargs = {'content_type': 'application/json'} if isinstance(data, str) else {}
+
+                # Roll each request back so write views don't change what the next one sees
+                with transaction.atomic(), CaptureQueriesContext(connection) as ctx:
+                    response = getattr(self.client, method)(url, data, **kwargs)
+                    if hasattr(response, 'streaming_content'):
+                        b''.join(response.streaming_content)
+                    transaction.set_rollback(True)
+
+                self.assertLess(response.status_code, 400, f'{label} returned {response.status_code}')
+                if len(ctx) > max_queries:
+                    sql = '\n'.join(f"{i}. {q['sql']}" for i, q in enumerate(ctx.captured_queries, 1))
+                    self.fail(f'{label}: {len(ctx)} queries, budget is {max_queries}:\n{sql}')
+                rows = self.rendered_rows(response)
+                self.assertLessEqual(rows, max_rows, f'{label} rendered {rows} rows, budget is {max_rows}')
+
+
+class TopProductsCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('owner', password='x', role='OWNER')
+        self.investor = User.objects.create_user('investor', password='x', role='INVESTOR')
+        self.other = User.objects.create_user('other', password='x', role='INVESTOR')
+        self.lamp, self.vase, self.rug = [
+            Product.objects.create(
+                investor=investor, name=name, quantity=50,
+                buying_price=Decimal('10.00'), selling_price=Decimal('15.00')
+            )
+            for investor, name in [(self.investor, 'Lamp'), (self.investor, 'Vase'), (self.other, 'Rug')]
+        ]
+
+    def sell(self, product, quantity):
+        with self.captureOnCommitCallbacks(execute=True):
+            checkout([{'product_id': product.pk, 'quantity': quantity}], seller=self.owner)
+
+    def test_ranks_by_quantity_per_investor_and_store_wide(self):
+        self.sell(self.lamp, 2)
+        self.sell(self.vase, 3)
+        self.sell(self.rug, 5)
+
+        mine = get_top_products(self.investor.pk)
+        self.assertEqual([(r['name'], r['quantity'], r['revenue']) for r in mine], [('Vase', 3, Decimal('45.00')), ('Lamp', 2, Decimal('30.00'))])
+        self.assertEqual([r['name'] for r in get_top_products(limit=2)], ['Rug', 'Vase'])
+
+    def test_cached_until_a_sale_for_that_investor(self):
+        self.sell(self.lamp, 1)
+        get_top_products(self.investor.pk)
+        with self.assertNumQueries(0):
+            get_top_products(self.investor.pk)
+
+        self.sell(self.vase, 4)
+        with self.assertNumQueries(1):
+            top = get_top_products(self.investor.pk)
+        self.assertEqual(top[0]['name'], 'Vase')
+
+
+class ForecastingTests(TestCase):
+    def test_fit_follows_flat_and_growing_demand(self):
+        days = np.arange(60)
+        matrix = np.vstack([np.full(60, 5.0), 2.0 + 0.5 * days, np.zeros(60)])
+
+        level, trend, alpha, rmse = fit_smoothing(matrix)
+        week = project(level, trend)[:, :7].sum(axis=1)
+
+        self.assertAlmostEqual(week[0], 35, delta=0.5)
+        self.assertGreater(trend[1], 0)
+        self.assertGreater(week[1], 7 * (2.0 + 0.5 * 59))
+        self.assertEqual(week[2], 0)
+
+    def test_refresh_replaces_forecasts_from_the_rollup(self):
+        investor = User.objects.create_user('investor', password='x', role='INVESTOR')
+        lamp, vase = [
+            Product.objects.create(
+                investor=investor, name=name, quantity=50,
+                buying_price=Decimal('10.00'), selling_price=Decimal('15.00')
+            )
+            for name in ('Lamp', 'Vase')
+        ]
+        today = timezone.localdate()
+        SalesDailyRollup.objects.bulk_create([
+            SalesDailyRollup(day=today - timedelta(days=d), product=lamp, investor=investor,
+                             payment_method='CASH', sale_count=1, quantity=4, revenue=Decimal('60.00'))
+            for d in range(1, 31)
+        ])
+        ProductForecast.objects.create(product=vase, daily_rate=1, trend=0, next_7_days=7, next_30_days=30,
+                                       alpha=0.1, error=0, generated_at=timezone.now())
+
+        self.assertEqual(refresh_forecasts(), 1)
+        forecast = ProductForecast.objects.get()
+        self.assertEqual(forecast.product, lamp)
+        self.assertAlmostEqual(forecast.next_7_days, 28, delta=0.5)
+
+
+class RestockTests(TestCase):
+    def setUp(self):
+        self.investor = User.objects.create_user('investor', password='x', role='INVESTOR')
+        self.fast, self.empty, self.idle = [
+            Product.objects.create(
+                investor=self.investor, name=name, quantity=quantity,
+                buying_price=Decimal('10.00'), selling_price=Decimal('15.00')
+            )
+            for name, quantity in (('Tea', 20), ('Rice', 0), ('Lamp', 40))
+        ]
+        today = timezone.localdate()
+        SalesDailyRollup.objects.bulk_create([
+            SalesDailyRollup(day=today - timedelta(days=d), product=product, investor=self.investor,
+                             payment_method='CASH', sale_count=1, quantity=5, revenue=Decimal('75.00'))
+            for d in range(1, 29)
+            for product in (self.fast, self.empty)
+        ])
+
+    def test_recommendations_from_velocity_and_stock(self):
+        self.assertEqual(refresh_restock(full=True), 3)
+        fast, empty, idle = [RestockRecommendation.objects.get(product=p) for p in (self.fast, self.empty, self.idle)]
+
+        # 5 units/day: 20 in stock is 4 days of cover, under the 10-day reorder point of 50
+        self.assertEqual(fast.status, 'REORDER')
+        self.assertAlmostEqual(fast.velocity, 5, places=2)
+        self.assertAlmostEqual(fast.days_of_cover, 4.0)
+        self.assertEqual(fast.reorder_point, 50)
+        self.assertEqual(fast.reorder_qty, 5 * 37 - 20)
+
+        self.assertEqual(empty.status, 'OUT')
+        self.assertEqual(empty.reorder_qty, 5 * 37)
+
+        self.assertEqual(idle.status, 'IDLE')
+        self.assertIsNone(idle.days_of_cover)
+        self.assertEqual(idle.reorder_qty, 0)
+
+    def test_low_stock_threshold_raises_the_reorder_point(self):
+        # Slow seller: 1 unit/day puts the velocity reorder point at 10, the threshold is 25
+        slow = Product.objects.create(
+            investor=self.investor, name='Soap', quantity=20, low_stock_threshold=25,
+            buying_price=Decimal('1.00'), selling_price=Decimal('2.00')
+        )
+        today = timezone.localdate()
+        SalesDailyRollup.objects.bulk_create([
+            SalesDailyRollup(day=today - timedelta(days=d), product=slow, investor=self.investor,
+                             payment_method='CASH', sale_count=1, quantity=1, revenue=Decimal('2.00'))
+            for d in range(1, 29)
+        ])
+        # Nothing sold, but stock is under the product's own threshold
+        self.idle.low_stock_threshold = 50
+        self.idle.save()
+
+        refresh_restock(full=True)
+        slow_rec = RestockRecommendation.objects.get(product=slow)
+        self.assertEqual((slow_rec.status, slow_rec.reorder_point), ('REORDER', 25))
+        self.assertEqual(slow_rec.reorder_qty, 37 - 20)
+        idle = RestockRecommendation.objects.get(product=self.idle)
+        self.assertEqual((idle.status, idle.reorder_point, idle.reorder_qty), ('REORDER', 50, 51 - 40))
+        self.assertIsNone(idle.days_of_cover)
+        # The velocity reorder point still wins when it is higher
+        self.assertEqual(RestockRecommendation.objects.get(product=self.fast).reorder_point, 50)
+
+    def test_incremental_refresh_only_recomputes_changed_products(self):
+        refresh_restock(full=True)
+        self.assertEqual(refresh_restock(), 0)
+
+        self.fast.quantity = 500
+        self.fast.save()
+        self.assertEqual(refresh_restock(), 1)
+        self.assertEqual(RestockRecommendation.objects.get(product=self.fast).status, 'OK')
+        self.assertEqual(RestockRecommendation.objects.get(product=self.empty).status, 'OUT')
@@ -13,10 +13,17 @@ urlpatterns = [
     path('customers/<int:customer_id>/', views.customer_profile, name='customer_profile'),
     path('sales-history/', views.sales_history, name='sales_history'),
     path('api/product-lookup/', views.api_get_product, name='api_product_lookup'),
+    path('api/product-lookup/batch/', views.api_get_products_batch, name='api_product_lookup_batch'),
+    path('api/catalog/', views.api_catalog, name='api_catalog'),
+    path('api/search/', views.api_search, name='api_search'),
+    path('api/customers/lookup/', views.api_customer_lookup, name='api_customer_lookup'),
     path('profile/', views.profile, name='profile'),
     path('sales-history/export/', views.export_sales_csv, name='export_sales_csv'),
     path('inventory/', views.inventory_list, name='inventory_list'),
     path('inventory/export/', views.export_inventory_csv, name='export_inventory_csv'), 
+    path('inventory/restock/', views.restock_list, name='restock_list'),
+    path('inventory/restock/export/', views.export_restock_csv, name='export_restock_csv'),
+    path('api/inventory/valuation/', views.api_inventory_valuation, name='api_inventory_valuation'),
     path('inventory/edit/<int:product_id>/', views.edit_product, name='edit_product'),
     path('approvals/', views.admin_approval_list, name='admin_approval_list'),
     path('approvals/approve/<int:request_id>/', views.approve_request, name='approve_request'),
@@ -26,4 +33,13 @@ urlpatterns = [
 
     # NEW INVESTOR PATH
     path('my-requests/', views.my_requests, name='my_requests'),
+
+    # ASYNC (ASGI) ENDPOINTS
+    path('api/async/product-lookup/', views.api_get_product_async, name='api_product_lookup_async'),
+    path('api/async/sell/', views.sell_product_async, name='sell_product_async'),
+    path('api/async/dashboard-stats/', views.api_dashboard_stats_async, name='api_dashboard_stats_async'),
+
+    # EXPORT JOBS
+    path('exports/<int:job_id>/', views.export_job_detail, name='export_job_detail'),
+    path('exports/<int:job_id>/download/', views.export_job_download, name='export_job_download'),
 ]
\ No newline at end of file
@@ -1,25 +1,34 @@
+import os
 import json
-import uuid
-import csv
 from decimal import Decimal
-from datetime import timedelta
-from django.utils import timezone
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import update_session_auth_hash
 from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q, F, Sum, Count, Max
-from django.db import transaction
-from django.http import JsonResponse, HttpResponse
+from django.db.models import Q, F, Count, Max
+from django.http import JsonResponse, FileResponse, Http404
+from django.core.paginator import Paginator
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_POST
 
 from .models import *
 from .forms import ProductForm
-from .analytics import get_predicted_top_product
+from .checkout import checkout
+from .catalog import product_index, get_catalog_bundle, product_summary, SUMMARY_FIELDS
+from .search import search, customer_prefix_search
+from .approvals import approve_requests
+from .pagination import keyset_page, cursor_queries
+from .exports import capture_params
+from .restock import filter_restock
+from .analytics import get_top_products, TOP_PRODUCTS_DAYS, get_demand_forecast, get_dashboard_stats, aget_dashboard_stats, get_period_start, filter_by_period, get_sales_totals, filter_inventory, get_inventory_valuation, get_investor_valuations, get_purchase_timeline
 
 # ==========================================
 # 1. DASHBOARD & ANALYTICS
 # ==========================================
+TOP_PRODUCTS_SHOWN = 5
+
 @login_required
 def dashboard(request):
     user = request.user
@@ -29,8 +38,8 @@ def dashboard(request):
     
     # 1. Handle Filters & Base Queries (Standard stuff)
     filter_investor_id = request.GET.get('investor')
-    products_query = Product.objects.all()
-    sales_query = Sale.objects.all().order_by('-date')
+    products_query = Product.objects.all().select_related('investor')
+    sales_query = Sale.objects.all().select_related('product', 'sold_by').order_by('-date')
     
     if filter_investor_id and filter_investor_id != 'all':
         products_query = products_query.filter(investor_id=filter_investor_id)
@@ -39,54 +48,20 @@ def dashboard(request):
     products = products_query
     sales_history = sales_query[:50]
 
-    # Global Stats
-    cash_income = Sale.objects.filter(payment_method='CASH').aggregate(t=Sum('total_amount'))['t'] or 0
-    card_income = Sale.objects.filter(payment_method='CARD').aggregate(t=Sum('total_amount'))['t'] or 0
-    online_income = Sale.objects.filter(payment_method='ONLINE').aggregate(t=Sum('total_amount'))['t'] or 0
-
-    payment_stats = {
-        'cash': round(cash_income, 2),
-        'card': round(card_income, 2),
-        'online': round(online_income, 2),
-        'total': round(cash_income + card_income + online_income, 2)
-    }
-
-    # Financials (Owner View)
-    investors_only = User.objects.filter(role='INVESTOR')
-    financials = []
-    for inv in investors_only:
-        t_earned = Sale.objects.filter(product__investor=inv).aggregate(total=Sum('investor_profit_amount'))['total'] or 0
-        t_paid = inv.payouts.aggregate(total=Sum('amount'))['total'] or 0
-        financials.append({
-            'investor': inv,
-            'earned': round(t_earned, 2),
-            'paid': round(t_paid, 2),
-            'due': round(t_earned - t_paid, 2)
-        })
-
+    # Payment totals, investor financials, wallet & champions
+    # (constant number of grouped queries, no per-investor loop)
+    stats = get_dashboard_stats(user)
     all_sellers = User.objects.filter(role__in=['OWNER', 'INVESTOR']).order_by('username')
-    owner_net_income = Sale.objects.aggregate(total=Sum('owner_profit_amount'))['total'] or 0
 
-    # --- NEW AI / CHAMPION LOGIC ---
-    
-    # 1. Calculate GLOBAL Champion (Store-wide best seller)
-    global_stat = Sale.objects.values('product__name').annotate(total_qty=Sum('quantity')).order_by('-total_qty').first()
-    global_champion = global_stat['product__name'] if global_stat else "No Sales Yet"
-
-    # 2. Calculate PERSONAL Champion (Logged-in user's best seller)
-    my_stat = Sale.objects.filter(product__investor=user).values('product__name').annotate(total_qty=Sum('quantity')).order_by('-total_qty').first()
-    my_champion = my_stat['product__name'] if my_stat else "No Sales Yet"
-
-    # Personal Wallet (Investor)
-    my_earned = 0
-    my_paid = 0
-    my_due = 0
-    
+    # Cached best sellers: investors see their own stock, everyone else the store (or filtered investor)
     if user.role == 'INVESTOR':
-        my_earned = Sale.objects.filter(product__investor=user).aggregate(total=Sum('investor_profit_amount'))['total'] or 0
-        my_paid = user.payouts.aggregate(total=Sum('amount'))['total'] or 0
-        my_due = my_earned - my_paid
-    
+        top_scope = user.pk
+    else:
+        top_scope = int(filter_investor_id) if filter_investor_id and filter_investor_id != 'all' else None
+    top_products = get_top_products(top_scope, limit=TOP_PRODUCTS_SHOWN)
+    # Precomputed by `manage.py refresh_forecasts`, nothing is fitted per request
+    demand_forecast = get_demand_forecast(top_scope, limit=TOP_PRODUCTS_SHOWN)
+
     pending_count = 0
     if user.role == 'OWNER':
         pending_count = ProductChangeRequest.objects.filter(status='PENDING').count()
@@ -94,20 +69,17 @@ def dashboard(request):
     context = {
         'products': products,
         'recent_sales': sales_history,
-        'financials': financials,
-        'owner_net_income': round(owner_net_income, 2),
-        'payment_stats': payment_stats,
         'sellers_list': all_sellers,
         'current_filter': int(filter_investor_id) if filter_investor_id and filter_investor_id != 'all' else 'all',
         'is_owner': user.role == 'OWNER',
-        'total_earned': round(my_earned, 2),
-        'total_paid': round(my_paid, 2),
-        'due': round(my_due, 2),
         'pending_approvals': pending_count,
+        'top_products': top_products,
+        'top_products_mine': user.role == 'INVESTOR',
+        'top_products_days': TOP_PRODUCTS_DAYS,
+        'demand_forecast': demand_forecast,
         
-        # Pass the calculated stats
-        'global_champion': global_champion,
-        'my_champion': my_champion
+        # Pass the calculated stats (payment_stats, financials, wallet, champions)
+        **stats
     }
 
     return render(request, 'store/dashboard.html', context)
@@ -186,6 +158,8 @@ def edit_product(request, product_id):
 
     return render(request, 'store/edit_product.html', {'form': form, 'product': product})
 
+INVENTORY_PAGE_SIZE = 50
+
 @login_required
 def inventory_list(request):
     # 1. Base Query: Get all products + Calculate Margin
@@ -193,30 +167,31 @@ def inventory_list(request):
         margin=F('selling_price') - F('buying_price')
     ).order_by('-created_at')
     
-    # 2. Get Search & Filter Parameters
+    # 2. Apply Search & Owner Filter
     search_query = request.GET.get('search', '').strip()
     filter_investor = request.GET.get('investor', '')
+    products = filter_inventory(products, request.GET)
+
+    # 3. Total Inventory Value + Count in ONE aggregate (no Python loop over the catalog)
+    total_inventory_value, product_count = get_inventory_valuation(products)
+
+    # 4. Only one page of rows is loaded (keyset on created_at, id)
+    page, next_cursor, prev_cursor = keyset_page(
+        products,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        page_size=INVENTORY_PAGE_SIZE,
+        keys=('created_at', 'id')
+    )
+    next_query, prev_query = cursor_queries(request.GET, next_cursor, prev_cursor)
 
-    # 3. Apply Search
-    if search_query:
-        products = products.filter(
-            Q(name__icontains=search_query) | 
-            Q(product_id__icontains=search_query)
-        )
-
-    # 4. Apply Owner Filter
-    if filter_investor and filter_investor != 'all':
-        products = products.filter(investor_id=filter_investor)
-
-    # 5. Calculate Total Inventory Value
-    total_inventory_value = sum(p.buying_price * p.quantity for p in products)
-    product_count = products.count()
-
-    # 6. Get Sellers list
+    # 5. Get Sellers list
     sellers = User.objects.filter(role__in=['OWNER', 'INVESTOR']).order_by('username')
 
     context = {
-        'products': products,
+        'products': page,
+        'next_query': next_query,
+        'prev_query': prev_query,
         'sellers': sellers,
         'search_query': search_query,
         'current_filter': int(filter_investor) if filter_investor and filter_investor != 'all' else 'all',
@@ -229,45 +204,78 @@ def inventory_list(request):
 
 @login_required
 def export_inventory_csv(request):
-    current_time = timezone.localtime(timezone.now()).strftime("%Y-%m-%d_%H-%M")
-    filename = f"inventory_report_{current_time}.csv"
-
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    writer = csv.writer(response)
-
-    writer.writerow(['Product ID', 'Name', 'Owner', 'Cost Price', 'Selling Price', 'Quantity', 'Stock Status', 'Total Stock Value'])
-
-    products = Product.objects.all().select_related('investor').order_by('-created_at')
-    
-    search_query = request.GET.get('search', '').strip()
-    filter_investor = request.GET.get('investor', '')
+    return enqueue_export(request, 'INVENTORY')
 
-    if search_query:
-        products = products.filter(
-            Q(name__icontains=search_query) | 
-            Q(product_id__icontains=search_query)
-        )
+RESTOCK_PAGE_SIZE = 50
 
-    if filter_investor and filter_investor != 'all':
-        products = products.filter(investor_id=filter_investor)
+@login_required
+def restock_list(request):
+    # 1. Investors see their own stock unless they pick another owner
+    params = request.GET.copy()
+    if request.user.role == 'INVESTOR' and 'investor' not in params:
+        params['investor'] = str(request.user.pk)
+    current_status = params.get('status') or 'action'
+    filter_investor = params.get('investor', '')
+
+    # 2. Read the precomputed recommendations (`manage.py refresh_restock`), one page at a time
+    recommendations = filter_restock(
+        RestockRecommendation.objects.select_related('product', 'product__investor'), params
+    )
+    page = Paginator(recommendations, RESTOCK_PAGE_SIZE).get_page(params.get('page'))
+
+    # 3. Status badge counts + last run for the same owner filter in ONE aggregate
+    scope = params.copy()
+    scope['status'] = 'all'
+    summary = filter_restock(RestockRecommendation.objects.all(), scope).order_by().aggregate(
+        out=Count('id', filter=Q(status='OUT')),
+        reorder=Count('id', filter=Q(status='REORDER')),
+        ok=Count('id', filter=Q(status='OK')),
+        idle=Count('id', filter=Q(status='IDLE')),
+        last_run=Max('computed_at'),
+    )
 
-    for p in products:
-        status = "Low Stock" if p.quantity <= p.low_stock_threshold else "In Stock"
-        total_val = p.buying_price * p.quantity
+    # Query strings for the CSV / page links (current filters) and the status pills (owner only)
+    filters = params.copy()
+    filters.pop('page', None)
+    filter_query = filters.urlencode()
+    filters.pop('status', None)
+
+    return render(request, 'store/restock_list.html', {
+        'recommendations': page,
+        'page': page,
+        'summary': summary,
+        'sellers': User.objects.filter(role__in=['OWNER', 'INVESTOR']).order_by('username'),
+        'current_filter': int(filter_investor) if filter_investor and filter_investor != 'all' else 'all',
+        'current_status': current_status,
+        'status_query': filters.urlencode(),
+        'filter_query': filter_query,
+    })
 
-        writer.writerow([
-            p.product_id,
-            p.name,
-            p.investor.username,
-            p.buying_price,
-            p.selling_price,
-            p.quantity,
-            status,
-            total_val
-        ])
+@login_required
+def export_restock_csv(request):
+    return enqueue_export(request, 'RESTOCK')
 
-    return response
+@login_required
+def api_inventory_valuation(request):
+    # Owners see every investor; investors only their own stock
+    investor_id = None if request.user.role == 'OWNER' else request.user.id
+    rows = get_investor_valuations(investor_id)
+
+    investors = [{
+        'investor_id': row['investor_id'],
+        'investor': row['investor__username'],
+        'products': row['product_count'],
+        'units': row['units'],
+        'stock_value': float(row['stock_value'] or 0),
+        'retail_value': float(row['retail_value'] or 0),
+        'low_stock': row['low_stock_count'],
+    } for row in rows]
+
+    return JsonResponse({
+        'investors': investors,
+        'total_stock_value': round(sum(i['stock_value'] for i in investors), 2),
+        'total_retail_value': round(sum(i['retail_value'] for i in investors), 2),
+    })
 
 # ==========================================
 # 3. SALES & CART SYSTEM
@@ -278,87 +286,144 @@ def api_get_product(request):
     if not query:
         return JsonResponse({'error': 'Empty query'}, status=400)
         
-    product = Product.objects.filter(
-        Q(product_id__iexact=query) | Q(name__iexact=query)
-    ).first()
+    # Resolved through the per-worker lookup index (no case-insensitive scan)
+    product = product_index.lookup(query)
     
     if product:
-        return JsonResponse({
-            'found': True,
-            'id': product.id,
-            'name': product.name,
-            'price': float(product.selling_price),
-            'stock': product.quantity,
-            'custom_id': product.product_id
-        })
+        return JsonResponse({'found': True, **product})
     return JsonResponse({'found': False})
 
 @login_required
-def sell_product(request):
-    recent_sales = Sale.objects.order_by('-date')[:5]
-
+def api_get_products_batch(request):
+    """Resolves many scanned codes / names in one round trip (pasted or bulk-scanned baskets)."""
     if request.method == 'POST':
         try:
-            data = json.loads(request.body)
-            cart_items = data.get('items', [])
-            customer_info = data.get('customer', {})
-            payment_method = data.get('payment_method', 'CASH')
-            discount_percent = Decimal(data.get('discount_percent', 0))
+            codes = json.loads(request.body).get('codes', [])
+        except (ValueError, AttributeError):
+            return JsonResponse({'error': 'Invalid JSON body'}, status=400)
+    else:
+        codes = request.GET.getlist('q')
 
-            if not cart_items:
-                return JsonResponse({'success': False, 'message': 'Cart is empty'})
+    if not isinstance(codes, list) or not codes:
+        return JsonResponse({'error': 'Empty query'}, status=400)
+    if len(codes) > 200:
+        return JsonResponse({'error': 'Too many codes (max 200)'}, status=400)
+
+    found = product_index.lookup_many(str(code) for code in codes)
+    items = []
+    for code in codes:
+        product = found.get(product_index.normalize(str(code)))
+        if product:
+            items.append({'q': code, 'found': True, **product})
+        else:
+            items.append({'q': code, 'found': False})
+    return JsonResponse({'items': items})
 
-            trans_id = str(uuid.uuid4())[:8].upper()
+SEARCH_LIMIT = 20
+CUSTOMER_SEARCH_FIELDS = ('id', 'name', 'mobile', 'email')
 
-            customer_obj = None
-            c_contact = customer_info.get('contact')
-            c_name = customer_info.get('name')
-            
-            if c_contact:
-                customer_obj, created = Customer.objects.get_or_create(
-                    mobile=c_contact,
-                    defaults={'name': c_name or "Unknown"}
-                )
-                if not created and c_name:
-                    customer_obj.name = c_name
-                    customer_obj.save()
-
-            with transaction.atomic():
-                total_sale_val = 0
-                for item in cart_items:
-                    product = Product.objects.get(id=item['product_id'])
-                    qty = int(item['quantity'])
-                    
-                    if product.quantity < qty:
-                        raise ValueError(f"Not enough stock for {product.name}")
-
-                    sale = Sale.objects.create(
-                        transaction_id=trans_id,
-                        product=product,
-                        sold_by=request.user,
-                        quantity=qty,
-                        discount_percent=discount_percent,
-                        payment_method=payment_method,
-                        customer=customer_obj,
-                        customer_name_text=c_name or "Walk-in",
-                        customer_contact=c_contact
-                    )
-                    total_sale_val += sale.total_amount
-
-                messages.success(request, f"✅ Transaction {trans_id} Complete! Total: ${round(total_sale_val, 2)}")
-                return JsonResponse({'success': True})
-
-        except ValueError as e:
-            return JsonResponse({'success': False, 'message': str(e)})
-        except Exception as e:
-            return JsonResponse({'success': False, 'message': "Server Error: " + str(e)})
+@login_required
+def api_search(request):
+    query = request.GET.get('q', '').strip()
+    kind = request.GET.get('kind', 'products')
+    if not query:
+        return JsonResponse({'error': 'Empty query'}, status=400)
+    if kind not in ('products', 'customers'):
+        return JsonResponse({'error': 'kind must be products or customers'}, status=400)
+
+    # Ranked through the trigram index (exact code first, fuzzy matches last)
+    if kind == 'products':
+        rows = search('P', query, SUMMARY_FIELDS, limit=SEARCH_LIMIT)
+        items = [{**product_summary(row), 'rank': row['rank']} for row in rows]
+    else:
+        items = search('C', query, CUSTOMER_SEARCH_FIELDS, limit=SEARCH_LIMIT)
+
+    return JsonResponse({'q': query, 'items': items})
+
+@login_required
+def api_customer_lookup(request):
+    query = request.GET.get('q', '').strip()
+    if len(query) < 2:
+        return JsonResponse({'items': []})
+
+    # Index range scans on mobile / LOWER(name) (no LIKE)
+    return JsonResponse({'items': customer_prefix_search(query, CUSTOMER_SEARCH_FIELDS)})
+
+@login_required
+@gzip_page
+def api_catalog(request):
+    """Versioned POS catalog: full snapshot, or only changes when `?since=<version>` is given."""
+    since = request.GET.get('since')
+    try:
+        since = int(since) if since else None
+    except ValueError:
+        since = None
+
+    return JsonResponse(get_catalog_bundle(since))
+
+def process_checkout(request, user):
+    """Handles a POS cart POST (shared by the WSGI and ASGI checkout views). Returns the JSON payload."""
+    try:
+        data = json.loads(request.body)
+        cart_items = data.get('items', [])
+        customer_info = data.get('customer', {})
+        payment_method = data.get('payment_method', 'CASH')
+        discount_percent = Decimal(data.get('discount_percent', 0))
+
+        if not cart_items:
+            return {'success': False, 'message': 'Cart is empty'}
+
+        customer_obj = None
+        c_contact = (customer_info.get('contact') or '').strip()
+        c_name = (customer_info.get('name') or '').strip()
+        
+        if c_contact:
+            # One indexed read; INSERT / UPDATE only for new customers or a changed name
+            customer_obj = Customer.upsert(c_contact, c_name)
+
+        # Bulk checkout: one product SELECT, one guarded stock UPDATE, one Sale INSERT
+        trans_id, sales = checkout(
+            cart_items,
+            seller=user,
+            payment_method=payment_method,
+            discount_percent=discount_percent,
+            customer=customer_obj,
+            customer_name=c_name or None,
+            customer_contact=c_contact or None
+        )
+        total_sale_val = sum(sale.total_amount for sale in sales)
+
+        messages.success(request, f"✅ Transaction {trans_id} Complete! Total: ${round(total_sale_val, 2)}")
+        return {'success': True}
+
+    except OutOfStockError as e:
+        return {
+            'success': False,
+            'message': str(e),
+            'out_of_stock': [
+                {'name': name, 'available': available, 'requested': requested}
+                for name, available, requested in e.shortages
+            ]
+        }
+    except ValueError as e:
+        return {'success': False, 'message': str(e)}
+    except Exception as e:
+        return {'success': False, 'message': "Server Error: " + str(e)}
+
+@login_required
+def sell_product(request):
+    if request.method == 'POST':
+        return JsonResponse(process_checkout(request, request.user))
 
+    recent_sales = Sale.objects.select_related('product').order_by('-date')[:5]
     return render(request, 'store/sell.html', {'recent_sales': recent_sales})
 
 
 # ==========================================
 # 4. SALES HISTORY & LEDGER
 # ==========================================
+SALES_PAGE_SIZE = 50
+
 @login_required
 def sales_history(request):
     sales = Sale.objects.all().select_related('product', 'sold_by', 'customer').order_by('-date')
@@ -368,26 +433,29 @@ def sales_history(request):
         sales = sales.filter(product__investor_id=filter_investor_id)
 
     filter_type = request.GET.get('filter')
-    today = timezone.now().date()
-
-    if filter_type == 'today':
-        sales = sales.filter(date__date=today)
-    elif filter_type == 'week':
-        start_date = today - timedelta(days=7)
-        sales = sales.filter(date__date__gte=start_date)
-    elif filter_type == 'month':
-        start_date = today - timedelta(days=30)
-        sales = sales.filter(date__date__gte=start_date)
-    elif filter_type == 'year':
-        start_date = today - timedelta(days=365)
-        sales = sales.filter(date__date__gte=start_date)
+    start_day = get_period_start(filter_type)
+    sales = filter_by_period(sales, filter_type)
     
-    total_revenue = sales.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-    total_count = sales.count()
+    # Period totals come from the daily rollup instead of scanning raw sales
+    total_revenue, total_count = get_sales_totals(
+        start_day=start_day,
+        investor_id=filter_investor_id if filter_investor_id and filter_investor_id != 'all' else None
+    )
     all_sellers = User.objects.filter(role__in=['OWNER', 'INVESTOR']).order_by('username')
 
+    # Keyset pagination on (date, id): only one page of the ledger is ever loaded
+    page, next_cursor, prev_cursor = keyset_page(
+        sales,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        page_size=SALES_PAGE_SIZE
+    )
+    next_query, prev_query = cursor_queries(request.GET, next_cursor, prev_cursor)
+
     return render(request, 'store/sales_history.html', {
-        'sales': sales,
+        'sales': page,
+        'next_query': next_query,
+        'prev_query': prev_query,
         'total_revenue': round(total_revenue, 2),
         'total_count': total_count,
         'filter_type': filter_type,
@@ -397,53 +465,7 @@ def sales_history(request):
 
 @login_required
 def export_sales_csv(request):
-    current_time = timezone.localtime(timezone.now()).strftime("%Y-%m-%d_%H-%M")
-    filename = f"sales_report_{current_time}.csv"
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    writer = csv.writer(response)
-    
-    writer.writerow(['Date', 'Transaction ID', 'Product', 'Sold By', 'Customer', 'Qty', 'Total Amount', 'Payment Method'])
-
-    sales = Sale.objects.all().select_related('product', 'sold_by', 'customer').order_by('-date')
-    filter_investor_id = request.GET.get('investor')
-    if filter_investor_id and filter_investor_id != 'all':
-        sales = sales.filter(product__investor_id=filter_investor_id)
-
-    filter_type = request.GET.get('filter')
-    today = timezone.now().date()
-
-    if filter_type == 'today':
-        sales = sales.filter(date__date=today)
-    elif filter_type == 'week':
-        start_date = today - timedelta(days=7)
-        sales = sales.filter(date__date__gte=start_date)
-    elif filter_type == 'month':
-        start_date = today - timedelta(days=30)
-        sales = sales.filter(date__date__gte=start_date)
-    elif filter_type == 'year':
-        start_date = today - timedelta(days=365)
-        sales = sales.filter(date__date__gte=start_date)
-
-    for sale in sales:
-        customer_name = sale.customer.name if sale.customer else (sale.customer_name_text or "Walk-in")
-        
-        # Convert UTC to Local Time before writing
-        local_date = timezone.localtime(sale.date)
-        formatted_date = local_date.strftime("%Y-%m-%d %I:%M %p")
-
-        writer.writerow([
-            formatted_date,
-            sale.transaction_id or "-",
-            sale.product.name,
-            sale.sold_by.username,
-            customer_name,
-            sale.quantity,
-            sale.total_amount,
-            sale.get_payment_method_display(),
-        ])
-
-    return response
+    return enqueue_export(request, 'SALES')
 
 # ==========================================
 # 5. USER PROFILE & CUSTOMERS
@@ -464,37 +486,48 @@ def profile(request):
         
     return render(request, 'store/profile.html', {'form': form})
 
+CUSTOMERS_PAGE_SIZE = 50
+RECEIPTS_PAGE_SIZE = 20
+
 @login_required
 def customer_list(request):
     sort_by = request.GET.get('sort', 'date') 
-    customers = Customer.objects.annotate(
-        total_spent=Sum('sales__total_amount'),
-        visit_count=Count('sales'),
-        last_visit=Max('sales__date')
-    )
+    # Lifetime stats are stored on the customer row: each sort is an index scan, no join
+    customers = Customer.objects.all()
 
     if sort_by == 'spent':
-        customers = customers.order_by('-total_spent')
+        customers = customers.order_by('-total_spent', '-id')
     elif sort_by == 'visits':
-        customers = customers.order_by('-visit_count')
+        customers = customers.order_by('-visit_count', '-id')
     else:
-        customers = customers.order_by('-last_visit')
+        customers = customers.order_by('-last_visit', '-id')
+
+    page = Paginator(customers, CUSTOMERS_PAGE_SIZE).get_page(request.GET.get('page'))
 
     return render(request, 'store/customer_list.html', {
-        'customers': customers,
+        'customers': page,
+        'page': page,
         'current_sort': sort_by
     })
 
 @login_required
 def customer_profile(request, customer_id):
     customer = get_object_or_404(Customer, id=customer_id)
-    history = customer.sales.all().order_by('-date')
-    total_spent = history.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
+    # Receipt-level timeline, one page at a time; lifetime totals come from the customer row
+    receipts, next_cursor, prev_cursor = get_purchase_timeline(
+        customer,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        page_size=RECEIPTS_PAGE_SIZE
+    )
+    next_query, prev_query = cursor_queries(request.GET, next_cursor, prev_cursor)
     
     return render(request, 'store/customer_profile.html', {
         'customer': customer,
-        'history': history,
-        'total_spent': total_spent
+        'receipts': receipts,
+        'next_query': next_query,
+        'prev_query': prev_query,
+        'total_spent': customer.total_spent
     })
 
 @login_required
@@ -521,45 +554,29 @@ def admin_approval_list(request):
         return redirect('dashboard')
     
     # Only show PENDING requests in the main list
-    pending_requests = ProductChangeRequest.objects.filter(status='PENDING').order_by('-created_at')
+    pending_requests = (
+        ProductChangeRequest.objects.filter(status='PENDING')
+        .select_related('requester', 'target_product').order_by('-created_at')
+    )
     return render(request, 'store/approval_list.html', {'requests': pending_requests})
 
-def process_approval(req):
-    """Applies the changes to the live Product table"""
-    if req.request_type == 'NEW':
-        Product.objects.create(
-            investor=req.requester,
-            name=req.name,
-            quantity=req.quantity,
-            buying_price=req.buying_price,
-            selling_price=req.selling_price,
-            low_stock_threshold=req.low_stock_threshold,
-            owner_split_percent=30,
-            investor_split_percent=70
-        )
-    elif req.request_type == 'EDIT' and req.target_product:
-        p = req.target_product
-        p.name = req.name
-        p.quantity = req.quantity
-        p.buying_price = req.buying_price
-        p.selling_price = req.selling_price
-        p.low_stock_threshold = req.low_stock_threshold
-        p.save()
-
 @login_required
+@require_POST
 def approve_request(request, request_id):
     if request.user.role != 'OWNER': return redirect('dashboard')
     
     req = get_object_or_404(ProductChangeRequest, id=request_id)
-    if req.status == 'PENDING':
-        process_approval(req) # Apply changes
-        req.status = 'APPROVED' # Update Status
-        req.save()
+    # Same set-based engine as "Approve All", for a batch of one
+    report = approve_requests(ProductChangeRequest.objects.filter(id=req.id))
+    if report and report[0]['outcome'] == 'REJECTED':
+        messages.warning(request, f"Request could not be applied: {report[0]['note']}")
+    elif report:
         messages.success(request, "Request Approved.")
         
     return redirect('admin_approval_list')
 
 @login_required
+@require_POST
 def reject_request(request, request_id):
     if request.user.role != 'OWNER': return redirect('dashboard')
     
@@ -572,24 +589,23 @@ def reject_request(request, request_id):
     return redirect('admin_approval_list')
 
 @login_required
+@require_POST
 def approve_all_requests(request):
     if request.user.role != 'OWNER': return redirect('dashboard')
     
-    pending = ProductChangeRequest.objects.filter(status='PENDING')
-    count = pending.count()
+    # One transaction: bulk INSERT for NEW, bulk UPDATE for EDIT, one status UPDATE
+    report = approve_requests(ProductChangeRequest.objects.filter(status='PENDING'))
     
-    if count > 0:
-        for req in pending:
-            process_approval(req)
-            req.status = 'APPROVED'
-            req.save()
-        messages.success(request, f"✅ Successfully approved all {count} pending requests.")
-    else:
+    if not report:
         messages.info(request, "No pending requests to approve.")
-        
-    return redirect('admin_approval_list')
+        return redirect('admin_approval_list')
+
+    applied = sum(1 for row in report if row['outcome'] != 'REJECTED')
+    messages.success(request, f"✅ Successfully approved {applied} of {len(report)} pending requests.")
+    return render(request, 'store/approval_report.html', {'report': report})
 
 @login_required
+@require_POST
 def reject_all_requests(request):
     if request.user.role != 'OWNER': return redirect('dashboard')
     
@@ -607,4 +623,86 @@ def reject_all_requests(request):
 def my_requests(request):
     # Show user's history (All statuses)
     my_history = ProductChangeRequest.objects.filter(requester=request.user).order_by('-created_at')
-    return render(request, 'store/request_history.html', {'history': my_history})
\ No newline at end of file
+    return render(request, 'store/request_history.html', {'history': my_history})
+
+
+# ==========================================
+# 7. ASYNC (ASGI) ENDPOINTS
+# ==========================================
+# Served by core.asgi under an ASGI server (e.g. gunicorn -k uvicorn.workers.UvicornWorker);
+# a slow query awaits instead of pinning a whole worker thread.
+
+@login_required
+async def api_get_product_async(request):
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse({'error': 'Empty query'}, status=400)
+
+    product = await product_index.alookup(query)
+    if product:
+        return JsonResponse({'found': True, **product})
+    return JsonResponse({'found': False})
+
+@login_required
+async def sell_product_async(request):
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'message': 'POST required'}, status=405)
+
+    # Checkout needs a DB transaction, which the async ORM cannot open: run it in a worker thread
+    user = await request.auser()
+    return JsonResponse(await sync_to_async(process_checkout)(request, user))
+
+@login_required
+async def api_dashboard_stats_async(request):
+    user = await request.auser()
+    stats = await aget_dashboard_stats(user)
+    if user.role == 'OWNER':
+        # Same figures as the dashboard page, with each investor reduced to id / username for JSON
+        stats['financials'] = [
+            {**row, 'investor_id': row['investor'].pk, 'investor': row['investor'].username}
+            for row in stats['financials']
+        ]
+    else:
+        # Like the dashboard page: only their own wallet, no owner income or other investors' dues
+        del stats['financials'], stats['owner_net_income']
+    return JsonResponse(stats)
+
+# ==========================================
+# 8. EXPORT JOBS (files built by `manage.py run_export_jobs`)
+# ==========================================
+def enqueue_export(request, kind):
+    # The worker builds the file; this request only records the filters
+    job = ExportJob.objects.create(
+        requested_by=request.user,
+        kind=kind,
+        params=capture_params(kind, request.GET),
+    )
+    messages.info(request, "Your report is being prepared. This page refreshes until it is ready.")
+    return redirect('export_job_detail', job_id=job.id)
+
+def get_export_job(request, job_id):
+    job = get_object_or_404(ExportJob, id=job_id)
+    if job.requested_by_id != request.user.id and request.user.role != 'OWNER':
+        raise Http404
+    return job
+
+@login_required
+def export_job_detail(request, job_id):
+    job = get_export_job(request, job_id)
+    recent_jobs = ExportJob.objects.filter(requested_by=request.user).order_by('-created_at')[:10]
+
+    return render(request, 'store/export_job.html', {
+        'job': job,
+        'recent_jobs': recent_jobs,
+        'is_working': job.status in ('PENDING', 'RUNNING'),
+    })
+
+@login_required
+def export_job_download(request, job_id):
+    job = get_export_job(request, job_id)
+    if job.status != 'DONE' or not os.path.exists(job.file_path):
+        messages.error(request, "This report is not available for download.")
+        return redirect('export_job_detail', job_id=job.id)
+
+    # FileResponse streams from disk in blocks (sendfile where the server supports it)
+    return FileResponse(open(job.file_path, 'rb'), as_attachment=True, filename=os.path.basename(job.file_path))